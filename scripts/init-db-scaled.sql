@@ -136,6 +136,26 @@ CREATE TABLE IF NOT EXISTS outbox_events (
 
 CREATE INDEX idx_outbox_status_created ON outbox_events(status, created_at);
 CREATE INDEX idx_outbox_aggregate ON outbox_events(aggregate_type, aggregate_id);
+-- Partial covering index for the publisher's pending-events poll
+CREATE INDEX idx_outbox_pending_created ON outbox_events(created_at)
+    INCLUDE (id, topic, partition_key) WHERE status = 'pending';
+-- Pending-row shard index for 8 sharded outbox publishers. The modulus must
+-- match num_workers in create_outbox_publishers (the query inlines it), or
+-- the planner falls back to idx_outbox_pending_created; recreate on change.
+CREATE INDEX idx_outbox_pending_shard ON outbox_events(
+    (mod(hashtextextended(partition_key, 0) & 9223372036854775807, 8)), created_at
+) WHERE status = 'pending';
+
+-- Wake idle outbox publishers on insert (see OutboxPublisher.listen)
+CREATE OR REPLACE FUNCTION notify_outbox_new() RETURNS TRIGGER AS $$
+BEGIN
+    PERFORM pg_notify('outbox_new', '');
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER outbox_notify AFTER INSERT ON outbox_events
+    FOR EACH STATEMENT EXECUTE FUNCTION notify_outbox_new();
 
 -- =============================================================================
 -- IDEMPOTENCY TABLE (for exactly-once processing)
@@ -2,4 +2,4 @@
 from .config import Settings, get_settings
 from .database import Base, get_db, init_db, AsyncSessionLocal
 from .kafka_client import KafkaProducer, KafkaConsumer, EventTypes, Topics
-from .redis_client import RedisClient, CacheKeys
+from .redis_client import RedisClient, CacheKeys, get_connection_pool, get_redis, close_connection_pool
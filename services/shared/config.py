@@ -16,6 +16,7 @@ class Settings(BaseSettings):
     
     # Redis
     redis_url: str = "redis://localhost:6379/0"
+    redis_max_connections: int = 100
     
     # Kafka
     kafka_bootstrap_servers: str = "localhost:29092"
@@ -25,6 +26,9 @@ class Settings(BaseSettings):
     jwt_algorithm: str = "HS256"
     jwt_expiration_minutes: int = 60
     
+    # Password hashing cost; lower (e.g. BCRYPT_ROUNDS=4) only in tests
+    bcrypt_rounds: int = 12
+    
     # Service URLs
     user_service_url: str = "http://localhost:8001"
     order_service_url: str = "http://localhost:8002"
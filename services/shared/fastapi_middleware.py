@@ -17,7 +17,7 @@ Usage:
 import time
 import uuid
 import logging
-from typing import Callable
+from typing import Callable, Iterable
 from fastapi import FastAPI, Request, Response
 from fastapi.responses import JSONResponse
 from starlette.middleware.base import BaseHTTPMiddleware
@@ -28,8 +28,11 @@ from .metrics import (
     HTTP_REQUEST_TOTAL,
     HTTP_IN_FLIGHT_REQUESTS,
     HTTP_ERRORS_TOTAL,
+    ENDPOINT_LABELS,
+    SKU_LABELS,
     set_service_info,
 )
+from .tracing import TraceContext, set_current_trace, reset_current_trace
 
 logger = logging.getLogger(__name__)
 
@@ -53,13 +56,14 @@ class MetricsMiddleware(BaseHTTPMiddleware):
     def __init__(self, app, service_name: str):
         super().__init__(app)
         self.service_name = service_name
+        self._routes_allowed = False
     
     async def dispatch(self, request: Request, call_next: Callable) -> Response:
         # Track in-flight requests
         HTTP_IN_FLIGHT_REQUESTS.labels(service=self.service_name).inc()
         
         # Start timing
-        start_time = time.time()
+        start_ns = time.perf_counter_ns()
         
         # Extract or generate correlation ID
         correlation_id = request.headers.get("X-Correlation-ID", str(uuid.uuid4()))
@@ -80,7 +84,7 @@ class MetricsMiddleware(BaseHTTPMiddleware):
             # Track error
             HTTP_ERRORS_TOTAL.labels(
                 service=self.service_name,
-                endpoint=request.url.path,
+                endpoint=self._endpoint_label(request),
                 error_type="server_error"
             ).inc()
             
@@ -92,8 +96,8 @@ class MetricsMiddleware(BaseHTTPMiddleware):
             
         finally:
             # Record metrics
-            latency = time.time() - start_time
-            endpoint = self._normalize_path(request.url.path)
+            latency = (time.perf_counter_ns() - start_ns) / 1e9
+            endpoint = self._endpoint_label(request)
             
             HTTP_REQUEST_LATENCY.labels(
                 service=self.service_name,
@@ -118,6 +122,24 @@ class MetricsMiddleware(BaseHTTPMiddleware):
                 f"correlation_id={correlation_id}"
             )
     
+    def _endpoint_label(self, request: Request) -> str:
+        """
+        Endpoint label for a request: the matched route template.
+        
+        Only the app's own routes get their own label; unmatched paths such
+        as scanner probes become "other". Routes are allowlisted on the
+        first request rather than at setup, since services usually declare
+        their endpoints after calling setup_observability.
+        """
+        if not self._routes_allowed:
+            ENDPOINT_LABELS.allow(
+                route.path for route in request.app.routes if getattr(route, "path", None)
+            )
+            self._routes_allowed = True
+        route = request.scope.get("route")
+        path = getattr(route, "path", None) or self._normalize_path(request.url.path)
+        return ENDPOINT_LABELS(path)
+    
     def _normalize_path(self, path: str) -> str:
         """
         Normalize path for metrics to avoid high cardinality.
@@ -152,8 +174,15 @@ class CorrelationIdMiddleware(BaseHTTPMiddleware):
     - Enables tracing requests across microservices
     - Essential for debugging distributed systems
     - Required for root cause analysis
+    
+    Also makes the request's TraceContext current for the duration of the
+    request (see observability.get_current_trace).
     """
     
+    def __init__(self, app, service_name: str = "unknown"):
+        super().__init__(app)
+        self.service_name = service_name
+    
     async def dispatch(self, request: Request, call_next: Callable) -> Response:
         # Get or create correlation ID
         correlation_id = request.headers.get(
@@ -165,7 +194,15 @@ class CorrelationIdMiddleware(BaseHTTPMiddleware):
         request.state.correlation_id = correlation_id
         
         # Process request
-        response = await call_next(request)
+        token = set_current_trace(TraceContext(
+            correlation_id=correlation_id,
+            parent_span_id=request.headers.get("X-Span-ID"),
+            service_name=self.service_name
+        ))
+        try:
+            response = await call_next(request)
+        finally:
+            reset_current_trace(token)
         
         # Add to response headers
         response.headers["X-Correlation-ID"] = correlation_id
@@ -177,7 +214,8 @@ def setup_observability(
     app: FastAPI,
     service_name: str,
     version: str = "1.0.0",
-    environment: str = "production"
+    environment: str = "production",
+    tracked_skus: Iterable[str] = ()
 ):
     """
     Setup production-grade observability for a FastAPI service.
@@ -187,6 +225,10 @@ def setup_observability(
     - Correlation ID propagation
     - Prometheus metrics endpoint
     - Health check endpoint
+    
+    Endpoint labels are limited to the app's route templates; other paths
+    are reported as "other". `tracked_skus` always get their own SKU label;
+    the remaining SKU slots are filled first-come up to the guard's bound.
     """
     
     # Set service info
@@ -194,7 +236,7 @@ def setup_observability(
     
     # Add middleware (order matters - first added is outermost)
     app.add_middleware(MetricsMiddleware, service_name=service_name)
-    app.add_middleware(CorrelationIdMiddleware)
+    app.add_middleware(CorrelationIdMiddleware, service_name=service_name)
     
     # Add metrics endpoint
     @app.get("/metrics")
@@ -222,6 +264,8 @@ def setup_observability(
         # Add actual dependency checks here
         return {"status": "ready"}
     
+    SKU_LABELS.allow(tracked_skus)
+    
     logger.info(f"Observability setup complete for {service_name}")
 
 
@@ -17,6 +17,8 @@ from datetime import datetime, timezone
 from aiokafka import AIOKafkaConsumer
 from aiokafka.errors import KafkaError
 
+from .tracing import TraceContext, set_current_trace, reset_current_trace
+
 logger = logging.getLogger(__name__)
 
 
@@ -190,6 +192,22 @@ class ReliableKafkaConsumer:
             logger.warning(f"No handler for event type: {event_type}")
             return True  # Don't retry unknown events
         
+        token = set_current_trace(TraceContext(
+            correlation_id=correlation_id,
+            service_name=self.service_name
+        ))
+        try:
+            return await self._run_handler(handler, event, correlation_id)
+        finally:
+            reset_current_trace(token)
+    
+    async def _run_handler(
+        self,
+        handler: Callable,
+        event: Dict[str, Any],
+        correlation_id: str
+    ) -> bool:
+        """Run a handler, retrying with backoff and sending to DLQ on exhaustion."""
         for attempt in range(self.max_retries + 1):
             try:
                 await handler(event, correlation_id)
@@ -15,22 +15,36 @@ Usage:
     
     # Get lag for a consumer group
     lag = await monitor.get_lag("order-service-group")
+    
+    # Or receive every new sample as it is polled
+    queue = monitor.subscribe()
+    lag = await queue.get()
 """
 
 import asyncio
 import logging
-from typing import Dict, List, Optional, Any
+from collections import deque
+from typing import Deque, Dict, List, Optional, Any, Tuple
 from dataclasses import dataclass
 from datetime import datetime, timezone
 
 from prometheus_client import Gauge
 
+try:
+    from aiokafka.admin import AIOKafkaAdminClient
+    _HAS_AIOKAFKA = True
+except ImportError:
+    AIOKafkaAdminClient = None
+    _HAS_AIOKAFKA = False
+
 logger = logging.getLogger(__name__)
 
 # Prometheus metrics
+# Named apart from metrics.KAFKA_CONSUMER_LAG (reported by the consumers
+# themselves) so both can be registered in one process.
 KAFKA_CONSUMER_LAG = Gauge(
-    'kafka_consumer_lag_messages',
-    'Number of messages consumer is behind',
+    'kafka_consumer_group_lag_messages',
+    'Number of messages consumer group is behind, from broker offsets',
     ['consumer_group', 'topic', 'partition']
 )
 
@@ -47,7 +61,7 @@ KAFKA_CONSUMER_LAG_SECONDS = Gauge(
 )
 
 
-@dataclass
+@dataclass(slots=True)
 class PartitionLag:
     """Lag information for a single partition."""
     topic: str
@@ -58,7 +72,7 @@ class PartitionLag:
     timestamp: datetime
 
 
-@dataclass
+@dataclass(slots=True)
 class ConsumerGroupLag:
     """Lag information for a consumer group."""
     consumer_group: str
@@ -82,30 +96,48 @@ class KafkaLagMonitor:
     Monitors Kafka consumer lag.
     
     Features:
-    - Periodic lag polling
+    - Periodic lag polling, adaptive to observed lag
     - Prometheus metrics export
     - Alerting thresholds
     - Historical tracking
+    - Lag-in-seconds from a sliding-window write-rate estimate
     """
     
+    # (timestamp, end_offset) samples kept per (group, topic) for write rate
+    WRITE_RATE_WINDOW = 10
+    
     def __init__(
         self,
         bootstrap_servers: str = "localhost:9092",
         poll_interval: int = 30,
-        alert_threshold: int = 10000
+        alert_threshold: int = 10000,
+        min_poll_interval: int = 5,
+        max_poll_interval: int = 300
     ):
         self.bootstrap_servers = bootstrap_servers
         self.poll_interval = poll_interval
         self.alert_threshold = alert_threshold
+        self.min_poll_interval = min_poll_interval
+        self.max_poll_interval = max_poll_interval
         self._running = False
         self._task: Optional[asyncio.Task] = None
         self._lag_history: Dict[str, List[ConsumerGroupLag]] = {}
+        self._current_lags: Dict[str, int] = {}
+        self._subscribers: List[asyncio.Queue] = []
+        self._write_samples: Dict[Tuple[str, str], Deque[Tuple[float, int]]] = {}
     
     async def start(self):
         """Start the lag monitor."""
         if self._running:
             return
         
+        if _HAS_AIOKAFKA:
+            self._poll_impl = self._poll_all_groups
+        else:
+            # Fallback for when aiokafka is not available
+            logger.warning("aiokafka not available, using mock lag data")
+            self._poll_impl = self._poll_mock_data
+        
         self._running = True
         self._task = asyncio.create_task(self._poll_loop())
         logger.info("Kafka lag monitor started")
@@ -123,45 +155,67 @@ class KafkaLagMonitor:
     
     async def _poll_loop(self):
         """Main polling loop."""
+        interval = self.poll_interval
+        
         while self._running:
+            previous_lags = self._current_lags.copy()
             try:
-                await self._poll_all_groups()
+                await self._poll_impl()
             except Exception as e:
                 logger.error(f"Error polling consumer lag: {e}")
+            else:
+                interval = self._next_poll_interval(interval, previous_lags)
             
-            await asyncio.sleep(self.poll_interval)
+            await asyncio.sleep(interval)
+    
+    def _next_poll_interval(self, interval: float, previous_lags: Dict[str, int]) -> float:
+        """
+        Adapt the poll interval to the lag just observed.
+        
+        Halves the interval (down to min_poll_interval) when any group is over
+        the alert threshold or grew by more than 50% since the last poll.
+        Doubles it (up to max_poll_interval) while every group is stable and
+        well under the threshold.
+        """
+        if not self._current_lags:
+            return interval
+        
+        max_lag = max(self._current_lags.values())
+        increasing = any(
+            lag > previous_lags.get(group, lag) * 1.5
+            for group, lag in self._current_lags.items()
+        )
+        
+        if increasing or max_lag > self.alert_threshold:
+            return max(self.min_poll_interval, interval / 2)
+        if max_lag < self.alert_threshold / 10:
+            return min(self.max_poll_interval, interval * 2)
+        return interval
     
     async def _poll_all_groups(self):
         """Poll lag for all consumer groups."""
+        admin = AIOKafkaAdminClient(bootstrap_servers=self.bootstrap_servers)
+        await admin.start()
+        
         try:
-            from aiokafka.admin import AIOKafkaAdminClient
+            # List consumer groups
+            groups = await admin.list_consumer_groups()
             
-            admin = AIOKafkaAdminClient(bootstrap_servers=self.bootstrap_servers)
-            await admin.start()
-            
-            try:
-                # List consumer groups
-                groups = await admin.list_consumer_groups()
-                
-                for group_id, _ in groups:
-                    lag = await self._get_group_lag(admin, group_id)
-                    if lag:
-                        self._update_metrics(lag)
-                        self._store_history(lag)
-                        self._check_alerts(lag)
-            finally:
-                await admin.close()
-                
-        except ImportError:
-            # Fallback for when aiokafka is not available
-            logger.warning("aiokafka not available, using mock lag data")
-            await self._poll_mock_data()
+            for group_id, _ in groups:
+                lag = await self._get_group_lag(admin, group_id)
+                if lag:
+                    self._update_metrics(lag)
+                    self._store_history(lag)
+                    self._check_alerts(lag)
+        finally:
+            await admin.close()
     
     async def _get_group_lag(self, admin, group_id: str) -> Optional[ConsumerGroupLag]:
         """Get lag for a specific consumer group."""
         try:
             # Get committed offsets
             offsets = await admin.list_consumer_group_offsets(group_id)
+            now = datetime.now(timezone.utc)
             
             partitions = []
             total_lag = 0
@@ -180,14 +234,14 @@ class KafkaLagMonitor:
                     current_offset=offset_meta.offset,
                     end_offset=end_offset,
                     lag=lag,
-                    timestamp=datetime.now(timezone.utc)
+                    timestamp=now
                 ))
             
             return ConsumerGroupLag(
                 consumer_group=group_id,
                 partitions=partitions,
                 total_lag=total_lag,
-                timestamp=datetime.now(timezone.utc)
+                timestamp=now
             )
             
         except Exception as e:
@@ -205,6 +259,8 @@ class KafkaLagMonitor:
             "notification-service-group"
         ]
         
+        now = datetime.now(timezone.utc)
+        
         for group_id in mock_groups:
             partitions = []
             total_lag = 0
@@ -219,14 +275,14 @@ class KafkaLagMonitor:
                     current_offset=random.randint(10000, 100000),
                     end_offset=random.randint(10000, 100000) + lag,
                     lag=lag,
-                    timestamp=datetime.now(timezone.utc)
+                    timestamp=now
                 ))
             
             lag_info = ConsumerGroupLag(
                 consumer_group=group_id,
                 partitions=partitions,
                 total_lag=total_lag,
-                timestamp=datetime.now(timezone.utc)
+                timestamp=now
             )
             
             self._update_metrics(lag_info)
@@ -247,6 +303,39 @@ class KafkaLagMonitor:
                 consumer_group=lag.consumer_group,
                 topic=topic
             ).set(topic_lag)
+        
+        self._update_lag_seconds(lag)
+    
+    def _update_lag_seconds(self, lag: ConsumerGroupLag):
+        """
+        Convert message lag to estimated seconds behind.
+        
+        Write rate per topic is the growth of the summed end offsets across
+        the sample window; lag / rate approximates how far behind the
+        producers, in time, the consumer group is.
+        """
+        end_offsets: Dict[str, int] = {}
+        for p in lag.partitions:
+            end_offsets[p.topic] = end_offsets.get(p.topic, 0) + p.end_offset
+        
+        now = lag.timestamp.timestamp()
+        for topic, topic_lag in lag.topics.items():
+            key = (lag.consumer_group, topic)
+            samples = self._write_samples.get(key)
+            if samples is None:
+                samples = self._write_samples[key] = deque(maxlen=self.WRITE_RATE_WINDOW)
+            samples.append((now, end_offsets[topic]))
+            
+            oldest_ts, oldest_offset = samples[0]
+            elapsed = now - oldest_ts
+            if elapsed <= 0:
+                continue
+            
+            rate = (end_offsets[topic] - oldest_offset) / elapsed
+            KAFKA_CONSUMER_LAG_SECONDS.labels(
+                consumer_group=lag.consumer_group,
+                topic=topic
+            ).set(topic_lag / max(rate, 1e-6))
     
     def _store_history(self, lag: ConsumerGroupLag):
         """Store lag history for trend analysis."""
@@ -255,11 +344,37 @@ class KafkaLagMonitor:
         
         history = self._lag_history[lag.consumer_group]
         history.append(lag)
+        self._current_lags[lag.consumer_group] = lag.total_lag
+        self._notify_subscribers(lag)
         
         # Keep only last 100 samples
         if len(history) > 100:
             self._lag_history[lag.consumer_group] = history[-100:]
     
+    def _notify_subscribers(self, lag: ConsumerGroupLag):
+        """Push a new sample to every subscriber, dropping its oldest if full."""
+        for queue in self._subscribers:
+            if queue.full():
+                queue.get_nowait()
+            queue.put_nowait(lag)
+    
+    def subscribe(self, maxsize: int = 100) -> asyncio.Queue:
+        """
+        Subscribe to lag updates.
+        
+        Returns a queue that receives every ConsumerGroupLag as it is polled.
+        Slow subscribers lose their oldest samples rather than blocking the
+        monitor.
+        """
+        queue: asyncio.Queue = asyncio.Queue(maxsize=maxsize)
+        self._subscribers.append(queue)
+        return queue
+    
+    def unsubscribe(self, queue: asyncio.Queue):
+        """Stop pushing lag updates to a queue returned by subscribe()."""
+        if queue in self._subscribers:
+            self._subscribers.remove(queue)
+    
     def _check_alerts(self, lag: ConsumerGroupLag):
         """Check if lag exceeds alert threshold."""
         if lag.total_lag > self.alert_threshold:
@@ -303,11 +418,7 @@ class KafkaLagMonitor:
     
     def get_all_lags(self) -> Dict[str, int]:
         """Get current lag for all consumer groups."""
-        result = {}
-        for group_id, history in self._lag_history.items():
-            if history:
-                result[group_id] = history[-1].total_lag
-        return result
+        return self._current_lags.copy()
 
 
 # =============================================================================
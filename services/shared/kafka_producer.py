@@ -13,20 +13,41 @@ Features:
 - Correlation ID propagation for tracing
 """
 
-import json
+import os
+import time
+import random
 import logging
-import uuid
 import asyncio
-from typing import Dict, Any, Optional, List
+from typing import Dict, Any, Optional, List, Tuple
 from datetime import datetime, timezone
-from dataclasses import dataclass, asdict
+from dataclasses import dataclass
+import orjson
 from aiokafka import AIOKafkaProducer
 from aiokafka.errors import KafkaError
 
 logger = logging.getLogger(__name__)
 
+# Crockford base32 alphabet used by ULIDs (no I, L, O, U)
+_ULID_ALPHABET = "0123456789ABCDEFGHJKMNPQRSTVWXYZ"
 
-@dataclass
+
+def new_event_id() -> str:
+    """
+    Generate a time-ordered ULID for event IDs.
+    
+    48-bit millisecond timestamp followed by 80 random bits, encoded once as
+    26 Crockford base32 characters. IDs sort by creation time, so keys
+    derived from them cluster on the broker.
+    """
+    value = ((time.time_ns() // 1_000_000) << 80) | int.from_bytes(os.urandom(10), "big")
+    chars = [""] * 26
+    for i in range(25, -1, -1):
+        chars[i] = _ULID_ALPHABET[value & 0x1F]
+        value >>= 5
+    return "".join(chars)
+
+
+@dataclass(slots=True)
 class EventEnvelope:
     """Standard event envelope with metadata for reliability."""
     event_id: str
@@ -38,31 +59,50 @@ class EventEnvelope:
     retry_count: int = 0
     
     def to_dict(self) -> Dict[str, Any]:
-        return asdict(self)
+        """
+        Shallow dict for serialization.
+        
+        payload is referenced, not copied - callers must not mutate it
+        after handing it to publish().
+        """
+        return {
+            "event_id": self.event_id,
+            "event_type": self.event_type,
+            "timestamp": self.timestamp,
+            "correlation_id": self.correlation_id,
+            "source_service": self.source_service,
+            "payload": self.payload,
+            "retry_count": self.retry_count,
+        }
 
 
 class PartitionStrategy:
-    """Kafka partition key strategies for ordering guarantees."""
+    """
+    Kafka partition key strategies for ordering guarantees.
+    
+    Keys are the raw entity IDs. Partitioning is per-topic, so a namespace
+    prefix can't prevent collisions - it only adds bytes to every message.
+    """
     
     @staticmethod
     def order_key(order_id: str) -> str:
         """Orders partitioned by order_id for ordering guarantees."""
-        return f"order:{order_id}"
+        return order_id
     
     @staticmethod
     def inventory_key(sku_id: str) -> str:
         """Inventory partitioned by sku_id to avoid races on same SKU."""
-        return f"sku:{sku_id}"
+        return sku_id
     
     @staticmethod
     def payment_key(order_id: str) -> str:
         """Payments partitioned by order_id to correlate with orders."""
-        return f"payment:{order_id}"
+        return order_id
     
     @staticmethod
     def user_key(user_id: str) -> str:
         """Users partitioned by user_id."""
-        return f"user:{user_id}"
+        return user_id
 
 
 class ReliableKafkaProducer:
@@ -71,7 +111,7 @@ class ReliableKafkaProducer:
     
     Features:
     - Idempotent producer (enable.idempotence=true)
-    - Automatic retries with exponential backoff
+    - Automatic retries with jittered exponential backoff
     - Dead letter queue for permanent failures
     - Event envelope with correlation ID
     """
@@ -81,19 +121,21 @@ class ReliableKafkaProducer:
         bootstrap_servers: str,
         service_name: str,
         max_retries: int = 3,
-        retry_backoff_ms: int = 100
+        retry_backoff_ms: int = 100,
+        max_retry_backoff_ms: int = 5000
     ):
         self.bootstrap_servers = bootstrap_servers
         self.service_name = service_name
         self.max_retries = max_retries
         self.retry_backoff_ms = retry_backoff_ms
+        self.max_retry_backoff_ms = max_retry_backoff_ms
         self._producer: Optional[AIOKafkaProducer] = None
         
     async def start(self):
         """Start the idempotent Kafka producer."""
         self._producer = AIOKafkaProducer(
             bootstrap_servers=self.bootstrap_servers,
-            value_serializer=lambda v: json.dumps(v).encode('utf-8'),
+            value_serializer=orjson.dumps,
             key_serializer=lambda k: k.encode('utf-8') if k else None,
             # Idempotent producer settings
             enable_idempotence=True,
@@ -141,25 +183,10 @@ class ReliableKafkaProducer:
         if not self._producer:
             raise RuntimeError("Producer not started")
         
-        # Create event envelope
-        envelope = EventEnvelope(
-            event_id=str(uuid.uuid4()),
-            event_type=event_type,
-            timestamp=datetime.now(timezone.utc).isoformat(),
-            correlation_id=correlation_id or str(uuid.uuid4()),
-            source_service=self.service_name,
-            payload=payload
+        envelope, kafka_headers = self._build_envelope(
+            event_type, payload, correlation_id, headers
         )
         
-        # Prepare headers
-        kafka_headers = [
-            ("correlation_id", envelope.correlation_id.encode()),
-            ("event_type", event_type.encode()),
-            ("source", self.service_name.encode()),
-        ]
-        if headers:
-            kafka_headers.extend([(k, v.encode()) for k, v in headers.items()])
-        
         # Publish with retry
         for attempt in range(self.max_retries + 1):
             try:
@@ -169,19 +196,20 @@ class ReliableKafkaProducer:
                     key=partition_key,
                     headers=kafka_headers
                 )
-                logger.debug(
-                    f"Published {event_type} to {topic} "
-                    f"[key={partition_key}, correlation_id={envelope.correlation_id}]"
-                )
+                if logger.isEnabledFor(logging.DEBUG):
+                    logger.debug(
+                        "Published %s to %s [key=%s, correlation_id=%s]",
+                        event_type, topic, partition_key, envelope.correlation_id
+                    )
                 return True
                 
             except KafkaError as e:
                 envelope.retry_count = attempt + 1
                 if attempt < self.max_retries:
-                    wait_time = self.retry_backoff_ms * (2 ** attempt) / 1000
+                    wait_time = self._backoff_seconds(attempt)
                     logger.warning(
-                        f"Kafka publish failed (attempt {attempt + 1}), "
-                        f"retrying in {wait_time}s: {e}"
+                        "Kafka publish failed (attempt %d), retrying in %.3fs: %s",
+                        attempt + 1, wait_time, e
                     )
                     await asyncio.sleep(wait_time)
                 else:
@@ -191,6 +219,75 @@ class ReliableKafkaProducer:
         
         return False
     
+    async def send(
+        self,
+        topic: str,
+        event_type: str,
+        payload: Dict[str, Any],
+        partition_key: str,
+        correlation_id: Optional[str] = None,
+        headers: Optional[Dict[str, str]] = None
+    ) -> asyncio.Future:
+        """
+        Enqueue an event without waiting for the broker ack.
+        
+        The record joins the producer's linger_ms batch; the returned future
+        resolves to the record metadata or raises the delivery error. There
+        is no retry or DLQ here - callers that batch (e.g. the outbox
+        publisher) own redelivery.
+        """
+        if not self._producer:
+            raise RuntimeError("Producer not started")
+        
+        envelope, kafka_headers = self._build_envelope(
+            event_type, payload, correlation_id, headers
+        )
+        return await self._producer.send(
+            topic,
+            value=envelope.to_dict(),
+            key=partition_key,
+            headers=kafka_headers
+        )
+    
+    def _build_envelope(
+        self,
+        event_type: str,
+        payload: Dict[str, Any],
+        correlation_id: Optional[str],
+        headers: Optional[Dict[str, str]]
+    ) -> Tuple[EventEnvelope, List[Tuple[str, bytes]]]:
+        """Create the event envelope and its Kafka headers."""
+        # Root events correlate to themselves
+        event_id = new_event_id()
+        envelope = EventEnvelope(
+            event_id=event_id,
+            event_type=event_type,
+            timestamp=datetime.now(timezone.utc).isoformat(),
+            correlation_id=correlation_id or event_id,
+            source_service=self.service_name,
+            payload=payload
+        )
+        
+        kafka_headers = [
+            ("correlation_id", envelope.correlation_id.encode()),
+            ("event_type", event_type.encode()),
+            ("source", self.service_name.encode()),
+        ]
+        if headers:
+            kafka_headers.extend([(k, v.encode()) for k, v in headers.items()])
+        
+        return envelope, kafka_headers
+    
+    def _backoff_seconds(self, attempt: int) -> float:
+        """
+        Capped exponential backoff with jitter.
+        
+        Jitter keeps producers across services from retrying in lockstep
+        after a broker blip.
+        """
+        backoff_ms = min(self.retry_backoff_ms * (2 ** attempt), self.max_retry_backoff_ms)
+        return backoff_ms * (0.5 + random.random() * 0.5) / 1000
+    
     async def _send_to_dlq(
         self,
         original_topic: str,
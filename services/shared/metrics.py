@@ -19,8 +19,8 @@ Why these metrics matter:
 """
 
 import time
-import functools
-from typing import Optional, Dict, Any, Callable
+import random
+from typing import Optional, Dict, Any, Callable, Iterable, Set
 from contextlib import contextmanager
 from prometheus_client import Counter, Histogram, Gauge, Summary, Info
 from prometheus_client import generate_latest, CONTENT_TYPE_LATEST
@@ -82,6 +82,13 @@ KAFKA_CONSUMER_LAG = Gauge(
     ['service', 'topic', 'partition', 'consumer_group']
 )
 
+# Consumer lag summed over partitions - one series per topic for SLO checks
+KAFKA_CONSUMER_TOPIC_LAG = Gauge(
+    'kafka_consumer_topic_lag_messages',
+    'Number of messages consumer is behind, summed across partitions',
+    ['service', 'topic', 'consumer_group']
+)
+
 # Dead-letter queue count - poison messages requiring investigation
 # Non-zero values require immediate attention
 KAFKA_DLQ_MESSAGES_TOTAL = Counter(
@@ -277,10 +284,144 @@ SERVICE_INFO = Info(
 )
 
 
+# =============================================================================
+# LABEL CARDINALITY GUARDS
+# =============================================================================
+
+# Every distinct label value is a new time series. Labels fed from request
+# paths, SKUs, partitions or exception names are unbounded, so they pass
+# through a guard that admits a fixed number of values and folds the rest
+# into "other". Folding only makes sense for counters and histograms, where
+# the "other" series sums its members; gauge helpers skip folded values,
+# since a shared "other" gauge would just hold whichever value came last.
+
+OTHER_LABEL = "other"
+
+
+class LabelGuard:
+    """
+    Bounds the distinct values a single label can take.
+    
+    With max_values, values registered through `allowed`/allow() always
+    pass and the first other values seen are admitted up to the limit;
+    this suits sets that are not known up front (partitions, warehouses,
+    SKUs). With max_values=0 the guard is a pure allowlist: only
+    values registered through `allowed` or allow() pass, so which values
+    keep their own series does not depend on what a pod happened to see
+    first (e.g. scanner paths filling the endpoint slots).
+    """
+    
+    def __init__(self, max_values: int = 0, allowed: Iterable[str] = ()):
+        self.max_values = max_values
+        self._seen: Set[str] = set(allowed)
+    
+    def allow(self, values: Iterable[str]) -> None:
+        """Register known values (e.g. route templates, tracked SKUs)."""
+        self._seen.update(values)
+    
+    def __call__(self, value: str) -> str:
+        if value in self._seen:
+            return value
+        if len(self._seen) < self.max_values:
+            self._seen.add(value)
+            return value
+        return OTHER_LABEL
+
+
+ENDPOINT_LABELS = LabelGuard()   # route templates, see setup_observability
+# Tracked SKUs (see setup_observability) plus first-come SKUs up to the bound
+SKU_LABELS = LabelGuard(max_values=500)
+WAREHOUSE_LABELS = LabelGuard(max_values=50)
+PARTITION_LABELS = LabelGuard(max_values=256)
+
+# Exception class name -> error label. A fixed table rather than a guard, so
+# an exception always maps to the same label regardless of which errors
+# happened to show up first after startup.
+_ERROR_LABELS = {
+    "TimeoutError": "timeout",
+    "KafkaTimeoutError": "timeout",
+    "ConnectionError": "conn",
+    "ConnectionRefusedError": "conn",
+    "OSError": "conn",
+    "KafkaConnectionError": "conn",
+    "ValueError": "bad_input",
+    "KeyError": "bad_input",
+    "TypeError": "bad_input",
+    "JSONDecodeError": "bad_payload",
+    "ValidationError": "bad_payload",
+    "IntegrityError": "db_conflict",
+    "OperationalError": "db_error",
+    "DBAPIError": "db_error",
+    "RedisError": "cache_error",
+}
+
+
+def error_label(exc: BaseException) -> str:
+    """Short, bounded label for an exception; unknown types become "other"."""
+    return _ERROR_LABELS.get(type(exc).__name__, OTHER_LABEL)
+
+
+# =============================================================================
+# SAMPLING
+# =============================================================================
+
+class MetricSampler:
+    """
+    Decides per call whether the tracking decorators record anything.
+    
+    Unsampled calls go straight to the wrapped function with no timing,
+    label lookup or try/finally. At rates below 1.0, counters and
+    histogram counts are scaled down by the rate.
+    """
+    
+    def __init__(self, rate: float = 1.0):
+        self.set_rate(rate)
+    
+    def set_rate(self, rate: float) -> None:
+        self.rate = min(max(rate, 0.0), 1.0)
+        self._always = self.rate >= 1.0
+    
+    def should_record(self) -> bool:
+        return self._always or random.random() < self.rate
+
+
+METRIC_SAMPLER = MetricSampler()
+
+
 # =============================================================================
 # INSTRUMENTATION DECORATORS
 # =============================================================================
 
+class _ChildCache(dict):
+    """
+    Memoizes labelled metric children keyed by the label value (or tuple of
+    values) that varies per call; the fixed labels are bound in the factory.
+    """
+    
+    def __init__(self, factory: Callable[[Any], Any]):
+        super().__init__()
+        self._factory = factory
+    
+    def __missing__(self, key):
+        child = self[key] = self._factory(key)
+        return child
+
+
+def copy_wrapper_metadata(wrapper: Callable, func: Callable) -> Callable:
+    """
+    Lightweight stand-in for functools.wraps on the tracking decorators.
+    
+    Copies only the identity attributes and skips the __dict__ merge.
+    __wrapped__ is kept because FastAPI reads endpoint signatures through it.
+    """
+    wrapper.__module__ = func.__module__
+    wrapper.__name__ = func.__name__
+    wrapper.__qualname__ = func.__qualname__
+    wrapper.__doc__ = func.__doc__
+    wrapper.__wrapped__ = func
+    return wrapper
+
+
 def track_http_request(service: str, endpoint: str, method: str = "POST"):
     """
     Decorator to track HTTP request metrics.
@@ -290,46 +431,60 @@ def track_http_request(service: str, endpoint: str, method: str = "POST"):
     - Request count
     - In-flight requests
     - Error rate
+    
+    Labelled children are resolved once here, not on every request.
     """
+    # Decorated endpoints are declared in code, so they are known values
+    ENDPOINT_LABELS.allow((endpoint,))
+    in_flight = HTTP_IN_FLIGHT_REQUESTS.labels(service=service)
+    server_errors = HTTP_ERRORS_TOTAL.labels(
+        service=service,
+        endpoint=endpoint,
+        error_type="server_error"
+    )
+    latency_by_status = _ChildCache(lambda status_code: HTTP_REQUEST_LATENCY.labels(
+        service=service,
+        endpoint=endpoint,
+        method=method,
+        status_code=status_code
+    ))
+    total_by_status = _ChildCache(lambda status_code: HTTP_REQUEST_TOTAL.labels(
+        service=service,
+        endpoint=endpoint,
+        method=method,
+        status_code=status_code
+    ))
+    # Warm the common status codes; others resolve on first use
+    for status_code in ("200", "400", "404", "500"):
+        latency_by_status[status_code]
+        total_by_status[status_code]
+    
     def decorator(func: Callable):
-        @functools.wraps(func)
         async def wrapper(*args, **kwargs):
-            HTTP_IN_FLIGHT_REQUESTS.labels(service=service).inc()
-            start_time = time.time()
+            if not METRIC_SAMPLER.should_record():
+                return await func(*args, **kwargs)
+            in_flight.inc()
+            start_ns = time.perf_counter_ns()
             status_code = "200"
             
             try:
                 result = await func(*args, **kwargs)
                 # Extract status code if available
-                if hasattr(result, 'status_code'):
-                    status_code = str(result.status_code)
+                result_status = getattr(result, 'status_code', None)
+                if result_status is not None:
+                    status_code = str(result_status)
                 return result
-            except Exception as e:
+            except Exception:
                 status_code = "500"
-                error_type = "server_error"
-                HTTP_ERRORS_TOTAL.labels(
-                    service=service,
-                    endpoint=endpoint,
-                    error_type=error_type
-                ).inc()
+                server_errors.inc()
                 raise
             finally:
-                latency = time.time() - start_time
-                HTTP_REQUEST_LATENCY.labels(
-                    service=service,
-                    endpoint=endpoint,
-                    method=method,
-                    status_code=status_code
-                ).observe(latency)
-                HTTP_REQUEST_TOTAL.labels(
-                    service=service,
-                    endpoint=endpoint,
-                    method=method,
-                    status_code=status_code
-                ).inc()
-                HTTP_IN_FLIGHT_REQUESTS.labels(service=service).dec()
+                latency = (time.perf_counter_ns() - start_ns) / 1e9
+                latency_by_status[status_code].observe(latency)
+                total_by_status[status_code].inc()
+                in_flight.dec()
         
-        return wrapper
+        return copy_wrapper_metadata(wrapper, func)
     return decorator
 
 
@@ -342,62 +497,69 @@ def track_kafka_message(service: str, topic: str):
     - Message count
     - Errors (sent to DLQ)
     """
+    consumed = KAFKA_MESSAGES_CONSUMED_TOTAL.labels(
+        service=service,
+        topic=topic,
+        consumer_group=f"{service}-group"
+    )
+    dlq_by_reason = _ChildCache(lambda error_reason: KAFKA_DLQ_MESSAGES_TOTAL.labels(
+        service=service,
+        topic=topic,
+        error_reason=error_reason
+    ))
+    processing_by_event = _ChildCache(lambda event_type: KAFKA_MESSAGE_PROCESSING_SECONDS.labels(
+        service=service,
+        topic=topic,
+        event_type=event_type
+    ))
+    
     def decorator(func: Callable):
-        @functools.wraps(func)
         async def wrapper(message: Dict[str, Any], *args, **kwargs):
+            if not METRIC_SAMPLER.should_record():
+                return await func(message, *args, **kwargs)
             event_type = message.get("event_type", "unknown")
-            start_time = time.time()
+            start_ns = time.perf_counter_ns()
             
             try:
                 result = await func(message, *args, **kwargs)
-                KAFKA_MESSAGES_CONSUMED_TOTAL.labels(
-                    service=service,
-                    topic=topic,
-                    consumer_group=f"{service}-group"
-                ).inc()
+                consumed.inc()
                 return result
             except Exception as e:
-                KAFKA_DLQ_MESSAGES_TOTAL.labels(
-                    service=service,
-                    topic=topic,
-                    error_reason=type(e).__name__
-                ).inc()
+                dlq_by_reason[error_label(e)].inc()
                 raise
             finally:
-                latency = time.time() - start_time
-                KAFKA_MESSAGE_PROCESSING_SECONDS.labels(
-                    service=service,
-                    topic=topic,
-                    event_type=event_type
-                ).observe(latency)
+                latency = (time.perf_counter_ns() - start_ns) / 1e9
+                processing_by_event[event_type].observe(latency)
         
-        return wrapper
+        return copy_wrapper_metadata(wrapper, func)
     return decorator
 
 
 def track_db_operation(service: str, operation: str, table: str):
     """Decorator to track database operations."""
+    query_latency = DB_QUERY_LATENCY_SECONDS.labels(
+        service=service,
+        operation=operation,
+        table=table
+    )
+    
     def decorator(func: Callable):
-        @functools.wraps(func)
         async def wrapper(*args, **kwargs):
-            start_time = time.time()
+            if not METRIC_SAMPLER.should_record():
+                return await func(*args, **kwargs)
+            start_ns = time.perf_counter_ns()
             try:
                 return await func(*args, **kwargs)
             finally:
-                latency = time.time() - start_time
-                DB_QUERY_LATENCY_SECONDS.labels(
-                    service=service,
-                    operation=operation,
-                    table=table
-                ).observe(latency)
-        return wrapper
+                query_latency.observe((time.perf_counter_ns() - start_ns) / 1e9)
+        return copy_wrapper_metadata(wrapper, func)
     return decorator
 
 
 @contextmanager
 def track_payment_processing(payment_method: str):
     """Context manager for tracking payment processing."""
-    start_time = time.time()
+    start_ns = time.perf_counter_ns()
     status = "success"
     try:
         yield
@@ -405,7 +567,7 @@ def track_payment_processing(payment_method: str):
         status = "failed"
         raise
     finally:
-        latency = time.time() - start_time
+        latency = (time.perf_counter_ns() - start_ns) / 1e9
         PAYMENT_PROCESSING_SECONDS.labels(
             payment_method=payment_method,
             status=status
@@ -424,7 +586,10 @@ def record_order_e2e_latency(created_at: float, confirmed_at: float, order_type:
 
 def record_oversell_incident(sku_id: str, warehouse: str = "default"):
     """Record an oversell incident - this should never happen!"""
-    INVENTORY_OVERSELL_INCIDENTS.labels(sku_id=sku_id, warehouse=warehouse).inc()
+    INVENTORY_OVERSELL_INCIDENTS.labels(
+        sku_id=SKU_LABELS(sku_id),
+        warehouse=WAREHOUSE_LABELS(warehouse)
+    ).inc()
 
 
 def record_duplicate_message(service: str, topic: str, event_type: str):
@@ -438,16 +603,23 @@ def record_duplicate_message(service: str, topic: str, event_type: str):
 
 def update_consumer_lag(service: str, topic: str, partition: int, consumer_group: str, lag: int):
     """Update Kafka consumer lag metric."""
+    partition = PARTITION_LABELS(str(partition))
+    if partition == OTHER_LABEL:
+        return
     KAFKA_CONSUMER_LAG.labels(
         service=service,
         topic=topic,
-        partition=str(partition),
+        partition=partition,
         consumer_group=consumer_group
     ).set(lag)
 
 
 def update_stock_levels(sku_id: str, warehouse: str, available: int, reserved: int):
     """Update inventory stock level metrics."""
+    sku_id = SKU_LABELS(sku_id)
+    warehouse = WAREHOUSE_LABELS(warehouse)
+    if sku_id == OTHER_LABEL or warehouse == OTHER_LABEL:
+        return
     INVENTORY_STOCK_LEVEL.labels(sku_id=sku_id, warehouse=warehouse).set(available)
     INVENTORY_RESERVED_STOCK.labels(sku_id=sku_id, warehouse=warehouse).set(reserved)
 
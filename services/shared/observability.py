@@ -17,70 +17,32 @@ Metrics to track:
 
 import time
 import logging
-import uuid
-import functools
 from typing import Optional, Dict, Any, Callable
 from contextlib import contextmanager
-from datetime import datetime, timezone
-from prometheus_client import Counter, Histogram, Gauge, Summary
+import orjson
+from prometheus_client import Counter, Histogram, Gauge
+
+from .metrics import (
+    METRIC_SAMPLER,
+    copy_wrapper_metadata,
+    track_http_request,
+    KAFKA_MESSAGE_PROCESSING_SECONDS,
+    DB_QUERY_LATENCY_SECONDS,
+)
+# Re-exported: trace context lives in .tracing, which registers no metrics
+from .tracing import (
+    TraceContext,
+    get_current_trace,
+    set_current_trace,
+    reset_current_trace,
+)
 
 # =============================================================================
 # PROMETHEUS METRICS
 # =============================================================================
 
-# Request metrics
-REQUEST_COUNT = Counter(
-    'ecommerce_requests_total',
-    'Total requests',
-    ['service', 'endpoint', 'method', 'status']
-)
-
-REQUEST_LATENCY = Histogram(
-    'ecommerce_request_latency_seconds',
-    'Request latency in seconds',
-    ['service', 'endpoint'],
-    buckets=[0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0]
-)
-
-# Kafka metrics
-KAFKA_MESSAGES_PRODUCED = Counter(
-    'ecommerce_kafka_messages_produced_total',
-    'Total Kafka messages produced',
-    ['service', 'topic']
-)
-
-KAFKA_MESSAGES_CONSUMED = Counter(
-    'ecommerce_kafka_messages_consumed_total',
-    'Total Kafka messages consumed',
-    ['service', 'topic', 'consumer_group']
-)
-
-KAFKA_CONSUMER_LAG = Gauge(
-    'ecommerce_kafka_consumer_lag',
-    'Kafka consumer lag',
-    ['service', 'topic', 'partition', 'consumer_group']
-)
-
-KAFKA_PROCESSING_TIME = Histogram(
-    'ecommerce_kafka_processing_seconds',
-    'Kafka message processing time',
-    ['service', 'event_type'],
-    buckets=[0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0]
-)
-
-# Database metrics
-DB_QUERY_LATENCY = Histogram(
-    'ecommerce_db_query_latency_seconds',
-    'Database query latency',
-    ['service', 'operation'],
-    buckets=[0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0]
-)
-
-DB_CONNECTIONS_ACTIVE = Gauge(
-    'ecommerce_db_connections_active',
-    'Active database connections',
-    ['service']
-)
+# Request, Kafka, DB, Redis-latency, reservation and oversell metrics live
+# in metrics.py; use those families (and their label sets) directly.
 
 # Redis metrics
 REDIS_OPERATIONS = Counter(
@@ -95,13 +57,6 @@ REDIS_HIT_RATE = Gauge(
     ['service']
 )
 
-REDIS_LATENCY = Histogram(
-    'ecommerce_redis_latency_seconds',
-    'Redis operation latency',
-    ['service', 'operation'],
-    buckets=[0.0005, 0.001, 0.005, 0.01, 0.025, 0.05, 0.1]
-)
-
 # Business metrics
 ORDER_COUNT = Counter(
     'ecommerce_orders_total',
@@ -115,76 +70,16 @@ PAYMENT_COUNT = Counter(
     ['status']  # initiated, completed, failed, refunded
 )
 
-INVENTORY_RESERVATIONS = Counter(
-    'ecommerce_inventory_reservations_total',
-    'Total inventory reservations',
-    ['status']  # reserved, confirmed, released, expired
-)
-
-INVENTORY_OVERSELL_INCIDENTS = Counter(
-    'ecommerce_inventory_oversell_incidents_total',
-    'Inventory oversell incidents (should be 0)',
-    ['sku_id']
-)
-
-# =============================================================================
-# DISTRIBUTED TRACING
-# =============================================================================
-
-class TraceContext:
-    """Context for distributed tracing."""
-    
-    def __init__(
-        self,
-        correlation_id: Optional[str] = None,
-        span_id: Optional[str] = None,
-        parent_span_id: Optional[str] = None,
-        service_name: str = "unknown"
-    ):
-        self.correlation_id = correlation_id or str(uuid.uuid4())
-        self.span_id = span_id or str(uuid.uuid4())[:8]
-        self.parent_span_id = parent_span_id
-        self.service_name = service_name
-        self.start_time = time.time()
-        self.attributes: Dict[str, Any] = {}
-    
-    def add_attribute(self, key: str, value: Any):
-        """Add attribute to trace."""
-        self.attributes[key] = value
-    
-    def to_headers(self) -> Dict[str, str]:
-        """Convert to HTTP/Kafka headers."""
-        return {
-            "X-Correlation-ID": self.correlation_id,
-            "X-Span-ID": self.span_id,
-            "X-Parent-Span-ID": self.parent_span_id or "",
-            "X-Service-Name": self.service_name
-        }
-    
-    @classmethod
-    def from_headers(cls, headers: Dict[str, str], service_name: str) -> "TraceContext":
-        """Create context from incoming headers."""
-        return cls(
-            correlation_id=headers.get("X-Correlation-ID"),
-            parent_span_id=headers.get("X-Span-ID"),
-            service_name=service_name
-        )
-    
-    def child_span(self, operation: str) -> "TraceContext":
-        """Create child span."""
-        return TraceContext(
-            correlation_id=self.correlation_id,
-            parent_span_id=self.span_id,
-            service_name=self.service_name
-        )
-
-
 # =============================================================================
 # STRUCTURED LOGGING
 # =============================================================================
 
 class StructuredLogger:
-    """Structured JSON logger with trace context."""
+    """
+    Structured JSON logger with trace context.
+    
+    trace_ctx defaults to the current context from get_current_trace().
+    """
     
     def __init__(self, service_name: str):
         self.service_name = service_name
@@ -198,8 +93,12 @@ class StructuredLogger:
         **kwargs
     ) -> Dict[str, Any]:
         """Format log entry as structured JSON."""
+        now = time.time()
         log_entry = {
-            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "timestamp": "%s.%03dZ" % (
+                time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(now)),
+                int(now * 1000) % 1000
+            ),
             "level": level,
             "service": self.service_name,
             "message": message,
@@ -214,96 +113,95 @@ class StructuredLogger:
         log_entry.update(kwargs)
         return log_entry
     
+    def _log(
+        self,
+        level: int,
+        message: str,
+        trace_ctx: Optional[TraceContext],
+        **kwargs
+    ):
+        """Emit one JSON line; skips all formatting when the level is disabled."""
+        if not self.logger.isEnabledFor(level):
+            return
+        if trace_ctx is None:
+            trace_ctx = get_current_trace()
+        entry = self._format_log(logging.getLevelName(level), message, trace_ctx, **kwargs)
+        self.logger.log(level, "%s", orjson.dumps(entry, default=str).decode())
+    
     def info(self, message: str, trace_ctx: Optional[TraceContext] = None, **kwargs):
-        self.logger.info(self._format_log("INFO", message, trace_ctx, **kwargs))
+        self._log(logging.INFO, message, trace_ctx, **kwargs)
     
     def warning(self, message: str, trace_ctx: Optional[TraceContext] = None, **kwargs):
-        self.logger.warning(self._format_log("WARNING", message, trace_ctx, **kwargs))
+        self._log(logging.WARNING, message, trace_ctx, **kwargs)
     
     def error(self, message: str, trace_ctx: Optional[TraceContext] = None, **kwargs):
-        self.logger.error(self._format_log("ERROR", message, trace_ctx, **kwargs))
+        self._log(logging.ERROR, message, trace_ctx, **kwargs)
     
     def debug(self, message: str, trace_ctx: Optional[TraceContext] = None, **kwargs):
-        self.logger.debug(self._format_log("DEBUG", message, trace_ctx, **kwargs))
+        self._log(logging.DEBUG, message, trace_ctx, **kwargs)
 
 
 # =============================================================================
 # DECORATORS FOR INSTRUMENTATION
 # =============================================================================
 
-def track_request(service: str, endpoint: str):
-    """Decorator to track request metrics."""
-    def decorator(func: Callable):
-        @functools.wraps(func)
-        async def wrapper(*args, **kwargs):
-            start_time = time.time()
-            status = "success"
-            
-            try:
-                result = await func(*args, **kwargs)
-                return result
-            except Exception as e:
-                status = "error"
-                raise
-            finally:
-                latency = time.time() - start_time
-                REQUEST_LATENCY.labels(service=service, endpoint=endpoint).observe(latency)
-                REQUEST_COUNT.labels(
-                    service=service,
-                    endpoint=endpoint,
-                    method="POST",
-                    status=status
-                ).inc()
-        
-        return wrapper
-    return decorator
+def track_request(service: str, endpoint: str, method: str = "POST"):
+    """Decorator to track request metrics; see metrics.track_http_request."""
+    return track_http_request(service, endpoint, method)
 
 
-def track_db_query(service: str, operation: str):
+def track_db_query(service: str, operation: str, table: str = "unknown"):
     """Decorator to track database query metrics."""
     def decorator(func: Callable):
-        @functools.wraps(func)
         async def wrapper(*args, **kwargs):
-            start_time = time.time()
+            if not METRIC_SAMPLER.should_record():
+                return await func(*args, **kwargs)
+            start_ns = time.perf_counter_ns()
             
             try:
                 result = await func(*args, **kwargs)
                 return result
             finally:
-                latency = time.time() - start_time
-                DB_QUERY_LATENCY.labels(service=service, operation=operation).observe(latency)
+                latency = (time.perf_counter_ns() - start_ns) / 1e9
+                DB_QUERY_LATENCY_SECONDS.labels(
+                    service=service,
+                    operation=operation,
+                    table=table
+                ).observe(latency)
         
-        return wrapper
+        return copy_wrapper_metadata(wrapper, func)
     return decorator
 
 
-def track_kafka_processing(service: str, event_type: str):
+def track_kafka_processing(service: str, event_type: str, topic: str = "unknown"):
     """Decorator to track Kafka message processing."""
     def decorator(func: Callable):
-        @functools.wraps(func)
         async def wrapper(*args, **kwargs):
-            start_time = time.time()
+            if not METRIC_SAMPLER.should_record():
+                return await func(*args, **kwargs)
+            start_ns = time.perf_counter_ns()
             
             try:
                 result = await func(*args, **kwargs)
                 return result
             finally:
-                latency = time.time() - start_time
-                KAFKA_PROCESSING_TIME.labels(
+                latency = (time.perf_counter_ns() - start_ns) / 1e9
+                KAFKA_MESSAGE_PROCESSING_SECONDS.labels(
                     service=service,
+                    topic=topic,
                     event_type=event_type
                 ).observe(latency)
         
-        return wrapper
+        return copy_wrapper_metadata(wrapper, func)
     return decorator
 
 
 @contextmanager
 def track_operation(service: str, operation: str, metric: Histogram):
     """Context manager for tracking operation latency."""
-    start_time = time.time()
+    start_ns = time.perf_counter_ns()
     try:
         yield
     finally:
-        latency = time.time() - start_time
+        latency = (time.perf_counter_ns() - start_ns) / 1e9
         metric.labels(service=service, operation=operation).observe(latency)
@@ -11,25 +11,47 @@ Solution: Transactional Outbox Pattern
 Interview line: "Outbox pattern guarantees we never lose events between DB and Kafka."
 """
 
+import os
+import time
 import logging
 import asyncio
-import json
 import uuid
-from typing import Dict, Any, Optional, List
+from typing import Dict, Any, Optional, List, Tuple
 from datetime import datetime, timezone
-from dataclasses import dataclass, asdict
+from dataclasses import dataclass
 from enum import Enum
 
+import orjson
+
 logger = logging.getLogger(__name__)
 
 
+def new_outbox_id() -> str:
+    """
+    Time-ordered UUID (version 7 layout) for outbox rows.
+    
+    The 48-bit millisecond prefix makes inserts append to the end of the
+    primary key and (status, created_at) indexes instead of landing on
+    random pages; the value still fits the UUID column.
+    """
+    rand = int.from_bytes(os.urandom(10), "big")
+    value = (
+        ((time.time_ns() // 1_000_000) << 80)
+        | (0x7 << 76)                          # version
+        | (((rand >> 62) & 0xFFF) << 64)       # rand_a
+        | (0b10 << 62)                         # variant
+        | (rand & ((1 << 62) - 1))             # rand_b
+    )
+    return str(uuid.UUID(int=value))
+
+
 class OutboxStatus(str, Enum):
     PENDING = "pending"
     PUBLISHED = "published"
     FAILED = "failed"
 
 
-@dataclass
+@dataclass(slots=True)
 class OutboxEvent:
     """Event stored in outbox table."""
     id: str
@@ -66,6 +88,18 @@ class OutboxRepository:
         error_message TEXT,
         INDEX idx_outbox_status_created (status, created_at)
     );
+    
+    Partial covering index for the pending-events poll:
+    CREATE INDEX idx_outbox_pending_created ON outbox_events (created_at)
+        INCLUDE (id, topic, partition_key) WHERE status = 'pending';
+    
+    Sharded publishers filter on a hash of partition_key, so every key
+    stays on one worker and keeps its ordering. The index modulus must
+    equal the publishers' num_workers; the planner only uses it then.
+    Index for 8 workers:
+    CREATE INDEX idx_outbox_pending_shard ON outbox_events
+        ((mod(hashtextextended(partition_key, 0) & 9223372036854775807, 8)), created_at)
+        WHERE status = 'pending';
     """
     
     def __init__(self, db_session):
@@ -89,7 +123,7 @@ class OutboxRepository:
             "aggregate_type": event.aggregate_type,
             "aggregate_id": event.aggregate_id,
             "event_type": event.event_type,
-            "payload": json.dumps(event.payload),
+            "payload": orjson.dumps(event.payload).decode(),
             "partition_key": event.partition_key,
             "topic": event.topic,
             "status": event.status.value,
@@ -98,17 +132,45 @@ class OutboxRepository:
         
         return event.id
     
-    async def get_pending_events(self, limit: int = 100) -> List[OutboxEvent]:
-        """Get pending events for publishing."""
-        query = """
-            SELECT * FROM outbox_events 
+    async def get_pending_events(
+        self,
+        limit: int = 100,
+        worker_id: int = 0,
+        num_workers: int = 1
+    ) -> List[OutboxEvent]:
+        """
+        Get pending events for publishing.
+        
+        Only the columns the publisher needs are fetched; status,
+        published_at and error_message are fixed for pending rows.
+        With num_workers > 1, only returns events whose partition_key hashes
+        to worker_id.
+        """
+        params = {"limit": limit}
+        shard_filter = ""
+        if num_workers > 1:
+            # Mask the sign bit so the modulo is never negative. The modulus
+            # is inlined (not bound) so the expression matches
+            # idx_outbox_pending_shard, which must be built with the same
+            # worker count.
+            shard_filter = (
+                "AND mod(hashtextextended(partition_key, 0) & 9223372036854775807, "
+                f"{int(num_workers)}) = :worker_id"
+            )
+            params["worker_id"] = worker_id
+        
+        query = f"""
+            SELECT id, aggregate_type, aggregate_id, event_type, payload,
+                   partition_key, topic, created_at, retry_count
+            FROM outbox_events 
             WHERE status = 'pending' 
+            {shard_filter}
             ORDER BY created_at ASC 
             LIMIT :limit
             FOR UPDATE SKIP LOCKED
         """
         
-        result = await self.session.execute(query, {"limit": limit})
+        result = await self.session.execute(query, params)
         rows = result.fetchall()
         
         return [
@@ -117,14 +179,12 @@ class OutboxRepository:
                 aggregate_type=row.aggregate_type,
                 aggregate_id=row.aggregate_id,
                 event_type=row.event_type,
-                payload=json.loads(row.payload),
+                payload=orjson.loads(row.payload),
                 partition_key=row.partition_key,
                 topic=row.topic,
-                status=OutboxStatus(row.status),
+                status=OutboxStatus.PENDING,
                 created_at=row.created_at.isoformat(),
-                published_at=row.published_at.isoformat() if row.published_at else None,
-                retry_count=row.retry_count,
-                error_message=row.error_message
+                retry_count=row.retry_count
             )
             for row in rows
         ]
@@ -138,6 +198,17 @@ class OutboxRepository:
         """
         await self.session.execute(query, {"id": event_id})
     
+    async def mark_published_bulk(self, event_ids: List[str]):
+        """Mark a batch of events as published in one statement."""
+        if not event_ids:
+            return
+        query = """
+            UPDATE outbox_events 
+            SET status = 'published', published_at = NOW()
+            WHERE id = ANY(CAST(:ids AS UUID[]))
+        """
+        await self.session.execute(query, {"ids": event_ids})
+    
     async def mark_failed(self, event_id: str, error: str):
         """Mark event as failed with error message."""
         query = """
@@ -149,6 +220,26 @@ class OutboxRepository:
         """
         await self.session.execute(query, {"id": event_id, "error": error})
     
+    async def mark_failed_bulk(self, errors: Dict[str, str]):
+        """Mark a batch of events as failed, each with its own error message."""
+        if not errors:
+            return
+        params: Dict[str, Any] = {}
+        rows = []
+        for i, (event_id, error) in enumerate(errors.items()):
+            params[f"id_{i}"] = event_id
+            params[f"error_{i}"] = error
+            rows.append(f"(:id_{i}, :error_{i})")
+        query = f"""
+            UPDATE outbox_events AS o
+            SET status = 'failed', 
+                retry_count = o.retry_count + 1,
+                error_message = v.error
+            FROM (VALUES {", ".join(rows)}) AS v(id, error)
+            WHERE o.id = CAST(v.id AS UUID)
+        """
+        await self.session.execute(query, params)
+    
     async def increment_retry(self, event_id: str):
         """Increment retry count."""
         query = """
@@ -157,6 +248,17 @@ class OutboxRepository:
             WHERE id = :id
         """
         await self.session.execute(query, {"id": event_id})
+    
+    async def increment_retry_bulk(self, event_ids: List[str]):
+        """Increment retry count for a batch of events."""
+        if not event_ids:
+            return
+        query = """
+            UPDATE outbox_events 
+            SET retry_count = retry_count + 1
+            WHERE id = ANY(CAST(:ids AS UUID[]))
+        """
+        await self.session.execute(query, {"ids": event_ids})
 
 
 class OutboxPublisher:
@@ -165,93 +267,192 @@ class OutboxPublisher:
     
     Runs continuously, polling for pending events and publishing them.
     Ensures at-least-once delivery (consumers must be idempotent).
+    
+    Several publishers can split the table by partition_key hash; see
+    create_outbox_publishers().
     """
     
     MAX_RETRIES = 5
     POLL_INTERVAL_SECONDS = 1
     BATCH_SIZE = 100
+    NOTIFY_CHANNEL = "outbox_new"
     
     def __init__(
         self,
         db_session_factory,
         kafka_producer,
-        service_name: str
+        service_name: str,
+        worker_id: int = 0,
+        num_workers: int = 1
     ):
+        if not 0 <= worker_id < num_workers:
+            raise ValueError(f"worker_id must be in [0, {num_workers}), got {worker_id}")
         self.db_factory = db_session_factory
         self.producer = kafka_producer
         self.service_name = service_name
-        self._running = False
+        self.worker_id = worker_id
+        self.num_workers = num_workers
+        self._stop_event = asyncio.Event()
+        self._wakeup = asyncio.Event()
     
     async def start(self):
         """Start the outbox publisher worker."""
-        self._running = True
-        logger.info(f"Outbox publisher started for {self.service_name}")
+        self._stop_event.clear()
+        logger.info(
+            f"Outbox publisher started for {self.service_name} "
+            f"[worker {self.worker_id + 1}/{self.num_workers}]"
+        )
         
-        while self._running:
+        while not self._stop_event.is_set():
             try:
                 published = await self._publish_batch()
                 if published == 0:
-                    # No events, wait before polling again
-                    await asyncio.sleep(self.POLL_INTERVAL_SECONDS)
+                    # No events, wait for a wakeup, stop() or the poll interval
+                    await self._wait_for_work()
             except Exception as e:
                 logger.error(f"Outbox publisher error: {e}")
-                await asyncio.sleep(self.POLL_INTERVAL_SECONDS)
+                await self._wait_for_work()
     
     async def stop(self):
-        """Stop the outbox publisher."""
-        self._running = False
+        """Stop the outbox publisher; an idle worker exits immediately."""
+        self._stop_event.set()
         logger.info("Outbox publisher stopped")
     
+    def wake(self, *_args):
+        """
+        Poll again now instead of at the end of the interval.
+        
+        Ignores its arguments so it can be registered directly as an
+        asyncpg listener callback (see listen()).
+        """
+        self._wakeup.set()
+    
+    async def listen(self, connection):
+        """
+        Wake this publisher on NOTIFY from the outbox_notify insert trigger.
+        
+        `connection` is a dedicated asyncpg connection kept open for the
+        publisher's lifetime. The poll interval still applies as a fallback
+        for missed notifications.
+        """
+        await connection.add_listener(self.NOTIFY_CHANNEL, self.wake)
+    
+    async def _wait_for_work(self):
+        wakeup = asyncio.ensure_future(self._wakeup.wait())
+        stop = asyncio.ensure_future(self._stop_event.wait())
+        try:
+            await asyncio.wait(
+                (wakeup, stop),
+                timeout=self.POLL_INTERVAL_SECONDS,
+                return_when=asyncio.FIRST_COMPLETED
+            )
+        finally:
+            wakeup.cancel()
+            stop.cancel()
+        self._wakeup.clear()
+    
     async def _publish_batch(self) -> int:
-        """Publish a batch of pending events."""
+        """
+        Publish a batch of pending events.
+        
+        Every event is enqueued on the producer without waiting for its ack,
+        so the batch goes out in as few produce requests as linger_ms
+        allows. Enqueue order matches created_at order, which keeps
+        per-partition-key ordering. Delivery results are awaited together,
+        then written back with one UPDATE per status instead of one per
+        event.
+        """
         async with self.db_factory() as session:
             repo = OutboxRepository(session)
-            events = await repo.get_pending_events(self.BATCH_SIZE)
+            events = await repo.get_pending_events(
+                self.BATCH_SIZE, self.worker_id, self.num_workers
+            )
             
             if not events:
                 return 0
             
-            published_count = 0
+            outcomes: List[Tuple[OutboxEvent, Optional[BaseException]]] = []
+            in_flight: List[Tuple[OutboxEvent, asyncio.Future]] = []
             
             for event in events:
                 try:
-                    # Publish to Kafka
-                    await self.producer.publish(
+                    delivery = await self.producer.send(
                         topic=event.topic,
                         event_type=event.event_type,
                         payload=event.payload,
                         partition_key=event.partition_key,
                         correlation_id=event.id
                     )
-                    
-                    # Mark as published
-                    await repo.mark_published(event.id)
-                    published_count += 1
-                    
+                    in_flight.append((event, delivery))
+                except Exception as e:
+                    outcomes.append((event, e))
+            
+            acks = await asyncio.gather(
+                *(delivery for _, delivery in in_flight),
+                return_exceptions=True
+            )
+            for (event, _), ack in zip(in_flight, acks):
+                outcomes.append((event, ack if isinstance(ack, BaseException) else None))
+            
+            published_ids: List[str] = []
+            retry_ids: List[str] = []
+            failed: Dict[str, str] = {}
+            
+            for event, error in outcomes:
+                if error is None:
+                    published_ids.append(event.id)
                     logger.debug(
                         f"Published outbox event: {event.event_type} "
                         f"[id={event.id}, topic={event.topic}]"
                     )
-                    
-                except Exception as e:
-                    if event.retry_count >= self.MAX_RETRIES:
-                        await repo.mark_failed(event.id, str(e))
-                        logger.error(
-                            f"Outbox event failed permanently: {event.id} - {e}"
-                        )
-                    else:
-                        await repo.increment_retry(event.id)
-                        logger.warning(
-                            f"Outbox publish failed (retry {event.retry_count + 1}): "
-                            f"{event.id} - {e}"
-                        )
+                elif event.retry_count >= self.MAX_RETRIES:
+                    failed[event.id] = str(error)
+                    logger.error(
+                        f"Outbox event failed permanently: {event.id} - {error}"
+                    )
+                else:
+                    retry_ids.append(event.id)
+                    logger.warning(
+                        f"Outbox publish failed (retry {event.retry_count + 1}): "
+                        f"{event.id} - {error}"
+                    )
             
+            await repo.mark_published_bulk(published_ids)
+            await repo.increment_retry_bulk(retry_ids)
+            await repo.mark_failed_bulk(failed)
             await session.commit()
             
-            if published_count > 0:
-                logger.info(f"Published {published_count} outbox events")
+            if published_ids:
+                logger.info(f"Published {len(published_ids)} outbox events")
             
-            return published_count
+            return len(published_ids)
+
+
+def create_outbox_publishers(
+    db_session_factory,
+    kafka_producer,
+    service_name: str,
+    num_workers: int
+) -> List[OutboxPublisher]:
+    """
+    Create publishers that each own one partition_key hash shard.
+    
+    Usage:
+        publishers = create_outbox_publishers(
+            AsyncSessionLocal, producer, "order-service", num_workers=8
+        )
+        await asyncio.gather(*(p.start() for p in publishers))
+    """
+    return [
+        OutboxPublisher(
+            db_session_factory,
+            kafka_producer,
+            service_name,
+            worker_id=worker_id,
+            num_workers=num_workers
+        )
+        for worker_id in range(num_workers)
+    ]
 
 
 def create_outbox_event(
@@ -277,12 +478,12 @@ def create_outbox_event(
                 event_type="order.created",
                 payload=order.to_dict(),
                 topic="orders",
-                partition_key=f"order:{order.id}"
+                partition_key=order.id
             )
             await outbox_repo.insert(outbox_event)
     """
     return OutboxEvent(
-        id=str(uuid.uuid4()),
+        id=new_outbox_id(),
         aggregate_type=aggregate_type,
         aggregate_id=aggregate_id,
         event_type=event_type,
@@ -2,15 +2,44 @@
 Redis caching utilities.
 """
 
-import json
 import logging
-from typing import Any, Optional
+from functools import lru_cache
+from typing import Any, Dict, List, Optional
+import orjson
 import redis.asyncio as redis
 from .config import get_settings
 
 logger = logging.getLogger(__name__)
 settings = get_settings()
 
+_pool: Optional[redis.ConnectionPool] = None
+
+
+def get_connection_pool() -> redis.ConnectionPool:
+    """Process-wide Redis connection pool shared by every client."""
+    global _pool
+    if _pool is None:
+        _pool = redis.ConnectionPool.from_url(
+            settings.redis_url,
+            max_connections=settings.redis_max_connections,
+            encoding="utf-8",
+            decode_responses=True
+        )
+    return _pool
+
+
+def get_redis() -> redis.Redis:
+    """Redis client on the shared pool (e.g. for DistributedTracker)."""
+    return redis.Redis(connection_pool=get_connection_pool())
+
+
+async def close_connection_pool():
+    """Close every pooled connection; call once at shutdown."""
+    global _pool
+    if _pool is not None:
+        await _pool.disconnect()
+        _pool = None
+
 
 class RedisClient:
     """Async Redis client for caching."""
@@ -20,11 +49,7 @@ class RedisClient:
         
     async def connect(self):
         """Connect to Redis."""
-        self._client = redis.from_url(
-            settings.redis_url,
-            encoding="utf-8",
-            decode_responses=True
-        )
+        self._client = get_redis()
         await self._client.ping()
         logger.info("Redis connected")
         
@@ -40,14 +65,30 @@ class RedisClient:
             return None
         value = await self._client.get(key)
         if value:
-            return json.loads(value)
+            return orjson.loads(value)
         return None
         
     async def set(self, key: str, value: Any, ttl: int = 3600):
         """Set value in cache with TTL."""
         if not self._client:
             return
-        await self._client.setex(key, ttl, json.dumps(value))
+        await self._client.setex(key, ttl, orjson.dumps(value))
+        
+    async def mget(self, keys: List[str]) -> List[Optional[Any]]:
+        """Get several values in one round trip; misses come back as None."""
+        if not self._client or not keys:
+            return [None] * len(keys)
+        values = await self._client.mget(keys)
+        return [orjson.loads(v) if v else None for v in values]
+        
+    async def mset(self, items: Dict[str, Any], ttl: int = 3600):
+        """Set several values with TTL in one pipelined round trip."""
+        if not self._client or not items:
+            return
+        pipe = self._client.pipeline(transaction=False)
+        for key, value in items.items():
+            pipe.setex(key, ttl, orjson.dumps(value))
+        await pipe.execute()
         
     async def delete(self, key: str):
         """Delete key from cache."""
@@ -75,9 +116,11 @@ class RedisClient:
 
 
 # Cache key patterns
+# Key builders are memoized: hot IDs reuse the same key string
 class CacheKeys:
     USER = "user:{user_id}"
     USER_SESSION = "session:{token}"
+    USER_AUTH = "auth:{email}"
     PRODUCT = "product:{product_id}"
     PRODUCT_LIST = "products:list"
     ORDER = "order:{order_id}"
@@ -85,17 +128,26 @@ class CacheKeys:
     RATE_LIMIT = "rate_limit:{ip}:{endpoint}"
     
     @staticmethod
+    @lru_cache(maxsize=16384)
     def user(user_id: str) -> str:
         return f"user:{user_id}"
     
     @staticmethod
+    @lru_cache(maxsize=16384)
+    def auth(email: str) -> str:
+        return f"auth:{email}"
+    
+    @staticmethod
+    @lru_cache(maxsize=16384)
     def product(product_id: str) -> str:
         return f"product:{product_id}"
     
     @staticmethod
+    @lru_cache(maxsize=16384)
     def order(order_id: str) -> str:
         return f"order:{order_id}"
     
     @staticmethod
+    @lru_cache(maxsize=16384)
     def inventory(product_id: str) -> str:
         return f"inventory:{product_id}"
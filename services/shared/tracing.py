@@ -0,0 +1,96 @@
+"""
+Distributed trace context and the per-request/per-message current trace.
+
+Kept free of Prometheus imports so modules that only need trace context
+(e.g. the Kafka consumer) do not register any metrics as a side effect.
+"""
+
+import os
+import time
+import random
+from typing import Optional, Dict, Any
+from contextvars import ContextVar, Token
+
+
+# Trace IDs only need to be unique, not unpredictable: one urandom-seeded
+# PRNG avoids an entropy read and UUID object per span.
+_trace_rng = random.Random(os.urandom(16))
+# Reseed in forked workers (e.g. gunicorn --preload), which would otherwise
+# all generate the same ID sequence
+os.register_at_fork(after_in_child=lambda: _trace_rng.seed(os.urandom(16)))
+
+
+class TraceContext:
+    """Context for distributed tracing."""
+    
+    def __init__(
+        self,
+        correlation_id: Optional[str] = None,
+        span_id: Optional[str] = None,
+        parent_span_id: Optional[str] = None,
+        service_name: str = "unknown"
+    ):
+        self.correlation_id = correlation_id or "%016x" % _trace_rng.getrandbits(64)
+        self.span_id = span_id or "%08x" % _trace_rng.getrandbits(32)
+        self.parent_span_id = parent_span_id
+        self.service_name = service_name
+        self.start_time = time.time()
+        self.attributes: Dict[str, Any] = {}
+        self._headers: Optional[Dict[str, str]] = None
+    
+    def add_attribute(self, key: str, value: Any):
+        """Add attribute to trace."""
+        self.attributes[key] = value
+    
+    def to_headers(self) -> Dict[str, str]:
+        """
+        Convert to HTTP/Kafka headers.
+        
+        Built once and reused for every downstream call; treat the returned
+        dict as read-only.
+        """
+        if self._headers is None:
+            self._headers = {
+                "X-Correlation-ID": self.correlation_id,
+                "X-Span-ID": self.span_id,
+                "X-Parent-Span-ID": self.parent_span_id or "",
+                "X-Service-Name": self.service_name
+            }
+        return self._headers
+    
+    @classmethod
+    def from_headers(cls, headers: Dict[str, str], service_name: str) -> "TraceContext":
+        """Create context from incoming headers."""
+        return cls(
+            correlation_id=headers.get("X-Correlation-ID"),
+            parent_span_id=headers.get("X-Span-ID"),
+            service_name=service_name
+        )
+    
+    def child_span(self, operation: str) -> "TraceContext":
+        """Create child span."""
+        return TraceContext(
+            correlation_id=self.correlation_id,
+            parent_span_id=self.span_id,
+            service_name=self.service_name
+        )
+
+
+# Trace context of the request or message being handled. Set by the HTTP
+# middleware and the Kafka consumer so callers don't thread trace_ctx through.
+_current_trace: ContextVar[Optional[TraceContext]] = ContextVar("current_trace", default=None)
+
+
+def get_current_trace() -> Optional[TraceContext]:
+    """Get the trace context of the current request/message, if any."""
+    return _current_trace.get()
+
+
+def set_current_trace(trace_ctx: Optional[TraceContext]) -> Token:
+    """Set the current trace context; pass the token to reset_current_trace()."""
+    return _current_trace.set(trace_ctx)
+
+
+def reset_current_trace(token: Token) -> None:
+    """Restore the trace context that was current before set_current_trace()."""
+    _current_trace.reset(token)
@@ -17,10 +17,12 @@ Why this matters:
 import time
 import asyncio
 import logging
-from typing import Dict, Any, Optional, Set
+from typing import Dict, Any, Optional, Set, List, Tuple
 from datetime import datetime, timezone
 from dataclasses import dataclass, field
-from collections import defaultdict
+from array import array
+from collections import defaultdict, deque
+import orjson
 import redis.asyncio as redis
 from prometheus_client import Histogram, Counter, Gauge
 
@@ -30,9 +32,12 @@ from .metrics import (
     ORDER_COMPLETION_TOTAL,
     KAFKA_DUPLICATE_MESSAGES_TOTAL,
     KAFKA_CONSUMER_LAG,
-    INVENTORY_OVERSELL_INCIDENTS,
-    INVENTORY_STOCK_LEVEL,
-    INVENTORY_RESERVED_STOCK,
+    KAFKA_CONSUMER_TOPIC_LAG,
+    PARTITION_LABELS,
+    OTHER_LABEL,
+    _ChildCache,
+    record_oversell_incident,
+    update_stock_levels,
 )
 
 logger = logging.getLogger(__name__)
@@ -61,20 +66,90 @@ class OrderWorkflow:
         })
 
 
+# Workflow timestamps come from the Redis server clock (TIME), so latencies
+# between events recorded by different services are not skewed by their
+# host clocks.
+
+# Stores a new workflow stamped with created_at and resets its events list.
+# KEYS: workflow JSON, events list. ARGV: workflow JSON, ttl.
+_START_WORKFLOW_LUA = """
+local t = redis.call('TIME')
+local wf = cjson.decode(ARGV[1])
+wf['created_at'] = tonumber(t[1]) + tonumber(t[2]) / 1e6
+redis.call('SET', KEYS[1], cjson.encode(wf), 'EX', ARGV[2])
+redis.call('DEL', KEYS[2])
+redis.call('RPUSH', KEYS[2], 'order.created')
+redis.call('EXPIRE', KEYS[2], ARGV[2])
+"""
+
+# Appends an event and moves the workflow to its new state atomically,
+# returning the previous state for the transition metric.
+# KEYS: workflow JSON, events list. ARGV: event_type, new_state, ttl.
+_RECORD_EVENT_LUA = """
+local t = redis.call('TIME')
+local raw = redis.call('GET', KEYS[1])
+local wf = raw and cjson.decode(raw) or {}
+local prev = wf['state']
+wf['state'] = ARGV[2]
+wf[ARGV[1] .. '_at'] = tonumber(t[1]) + tonumber(t[2]) / 1e6
+if raw then
+    redis.call('SET', KEYS[1], cjson.encode(wf), 'KEEPTTL')
+else
+    redis.call('SET', KEYS[1], cjson.encode(wf), 'EX', ARGV[3])
+end
+redis.call('RPUSH', KEYS[2], ARGV[1])
+redis.call('EXPIRE', KEYS[2], ARGV[3], 'NX')
+return prev
+"""
+
+# Marks a workflow complete without clobbering fields written concurrently
+# by record_event, returning {e2e_latency, order_type} or nil if missing.
+# E2E latency is computed here and returned as a string, since Lua numbers
+# would be truncated to integers in the reply.
+# KEYS: workflow JSON. ARGV: status.
+_COMPLETE_WORKFLOW_LUA = """
+local raw = redis.call('GET', KEYS[1])
+if not raw then
+    return nil
+end
+local t = redis.call('TIME')
+local now = tonumber(t[1]) + tonumber(t[2]) / 1e6
+local wf = cjson.decode(raw)
+local e2e = now - (wf['created_at'] or now)
+wf['state'] = ARGV[1]
+wf['completed_at'] = now
+wf['e2e_latency_seconds'] = e2e
+redis.call('SET', KEYS[1], cjson.encode(wf), 'KEEPTTL')
+return {string.format('%.6f', e2e), wf['order_type'] or 'standard'}
+"""
+
+
 class WorkflowTracker:
     """
     Tracks end-to-end workflow latency for orders.
     
     Workflow: order.created → inventory.reserved → payment.completed → order.confirmed
     
-    Uses Redis for distributed tracking across services.
+    Uses Redis for distributed tracking across services. Each workflow is
+    one orjson-encoded value plus a list of event names. Expects a client
+    with decode_responses=True, such as redis_client.get_redis().
     """
     
+    FLUSH_INTERVAL_SECONDS = 0.005
+    FLUSH_MAX_EVENTS = 100
+    
     def __init__(self, redis_client: redis.Redis, service_name: str):
         self.redis = redis_client
         self.service_name = service_name
         self.prefix = "workflow:"
         self.ttl = 3600  # 1 hour TTL for workflow data
+        self._start_workflow_script = redis_client.register_script(_START_WORKFLOW_LUA)
+        self._record_event_script = redis_client.register_script(_RECORD_EVENT_LUA)
+        self._complete_workflow_script = redis_client.register_script(_COMPLETE_WORKFLOW_LUA)
+        self._pending: List[Tuple[str, str, str]] = []
+        self._batch_full = asyncio.Event()
+        self._flush_lock = asyncio.Lock()
+        self._flusher: Optional[asyncio.Task] = None
     
     async def start_workflow(self, order_id: str, order_type: str = "standard") -> None:
         """
@@ -86,13 +161,13 @@ class WorkflowTracker:
         workflow_data = {
             "order_id": order_id,
             "order_type": order_type,
-            "created_at": time.time(),
-            "state": "created",
-            "events": "order.created"
+            "state": "created"
         }
         
-        await self.redis.hset(workflow_key, mapping=workflow_data)
-        await self.redis.expire(workflow_key, self.ttl)
+        await self._start_workflow_script(
+            keys=[workflow_key, f"{workflow_key}:events"],
+            args=[orjson.dumps(workflow_data), self.ttl]
+        )
         
         logger.info(f"Workflow started: order_id={order_id}")
     
@@ -100,32 +175,80 @@ class WorkflowTracker:
         """
         Record an event in the workflow.
         
-        Called by each service as it processes the order.
+        Called by each service as it processes the order. The update is
+        queued and returns immediately; a background flusher writes queued
+        events in one pipeline every FLUSH_INTERVAL_SECONDS, or as soon as
+        FLUSH_MAX_EVENTS are waiting, so event handlers never wait on Redis.
         """
-        workflow_key = f"{self.prefix}{order_id}"
-        timestamp = time.time()
-        
-        # Get current state for transition tracking
-        current_state = await self.redis.hget(workflow_key, "state")
-        if current_state:
-            current_state = current_state.decode() if isinstance(current_state, bytes) else current_state
-            ORDER_STATE_TRANSITIONS_TOTAL.labels(
-                from_state=current_state,
-                to_state=new_state
-            ).inc()
-        
-        # Update workflow
-        events = await self.redis.hget(workflow_key, "events")
-        events = events.decode() if isinstance(events, bytes) else (events or "")
-        events = f"{events},{event_type}" if events else event_type
-        
-        await self.redis.hset(workflow_key, mapping={
-            "state": new_state,
-            "events": events,
-            f"{event_type}_at": timestamp
-        })
+        self._pending.append((order_id, event_type, new_state))
+        if len(self._pending) >= self.FLUSH_MAX_EVENTS:
+            self._batch_full.set()
+        if self._flusher is None or self._flusher.done():
+            self._flusher = asyncio.create_task(self._flush_loop())
+    
+    async def flush(self) -> None:
+        """
+        Write all queued record_event updates in one pipelined round trip.
+        
+        Each update runs the record-event Lua script: the event is appended
+        to a per-workflow list and the state moves atomically, returning the
+        previous state for the transition metric. The TTL set by
+        start_workflow is left alone; a new TTL is only set on keys created
+        here for a workflow that was never started.
         
-        logger.info(f"Workflow event: order_id={order_id}, event={event_type}, state={new_state}")
+        Flushes are serialized, so when this returns every event queued
+        before the call has been written, including any batch the
+        background flusher already had in flight.
+        """
+        async with self._flush_lock:
+            if not self._pending:
+                return
+            batch, self._pending = self._pending, []
+            
+            async with self.redis.pipeline(transaction=False) as pipe:
+                for order_id, event_type, new_state in batch:
+                    workflow_key = f"{self.prefix}{order_id}"
+                    await self._record_event_script(
+                        keys=[workflow_key, f"{workflow_key}:events"],
+                        args=[event_type, new_state, self.ttl],
+                        client=pipe
+                    )
+                previous_states = await pipe.execute()
+        
+        for (order_id, event_type, new_state), current_state in zip(batch, previous_states):
+            if current_state:
+                ORDER_STATE_TRANSITIONS_TOTAL.labels(
+                    from_state=current_state,
+                    to_state=new_state
+                ).inc()
+            
+            logger.info(f"Workflow event: order_id={order_id}, event={event_type}, state={new_state}")
+    
+    async def _flush_loop(self):
+        while self._pending:
+            try:
+                await asyncio.wait_for(self._batch_full.wait(), self.FLUSH_INTERVAL_SECONDS)
+            except asyncio.TimeoutError:
+                pass
+            self._batch_full.clear()
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.error(f"Workflow event flush failed: {e}")
+    
+    async def aclose(self) -> None:
+        """Stop the background flusher and write any queued events."""
+        if self._flusher is not None:
+            # Holding the lock means the flusher is not mid-write, so
+            # cancelling it cannot drop a batch it already took
+            async with self._flush_lock:
+                self._flusher.cancel()
+            try:
+                await self._flusher
+            except asyncio.CancelledError:
+                pass
+            self._flusher = None
+        await self.flush()
     
     async def complete_workflow(self, order_id: str, status: str = "confirmed") -> Optional[float]:
         """
@@ -135,38 +258,25 @@ class WorkflowTracker:
         Returns the E2E latency in seconds.
         """
         workflow_key = f"{self.prefix}{order_id}"
-        completed_at = time.time()
         
-        # Get workflow data
-        workflow_data = await self.redis.hgetall(workflow_key)
-        if not workflow_data:
+        # Queued events must land before the final state is written
+        await self.flush()
+        
+        # Stamp completion server-side in one atomic read-modify-write
+        completion = await self._complete_workflow_script(
+            keys=[workflow_key],
+            args=[status]
+        )
+        if completion is None:
             logger.warning(f"Workflow not found: order_id={order_id}")
             return None
         
-        # Decode bytes
-        workflow_data = {
-            k.decode() if isinstance(k, bytes) else k: 
-            v.decode() if isinstance(v, bytes) else v 
-            for k, v in workflow_data.items()
-        }
-        
-        created_at = float(workflow_data.get("created_at", completed_at))
-        order_type = workflow_data.get("order_type", "standard")
-        
-        # Calculate E2E latency
-        e2e_latency = completed_at - created_at
+        e2e_latency, order_type = float(completion[0]), completion[1]
         
         # Record metrics
         ORDER_E2E_LATENCY_SECONDS.labels(order_type=order_type).observe(e2e_latency)
         ORDER_COMPLETION_TOTAL.labels(status=status).inc()
         
-        # Update workflow
-        await self.redis.hset(workflow_key, mapping={
-            "state": status,
-            "completed_at": completed_at,
-            "e2e_latency_seconds": e2e_latency
-        })
-        
         logger.info(
             f"Workflow completed: order_id={order_id}, status={status}, "
             f"e2e_latency={e2e_latency:.3f}s"
@@ -177,16 +287,17 @@ class WorkflowTracker:
     async def get_workflow_stats(self, order_id: str) -> Optional[Dict[str, Any]]:
         """Get workflow statistics for an order."""
         workflow_key = f"{self.prefix}{order_id}"
-        data = await self.redis.hgetall(workflow_key)
+        async with self.redis.pipeline(transaction=False) as pipe:
+            pipe.get(workflow_key)
+            pipe.lrange(f"{workflow_key}:events", 0, -1)
+            raw, events = await pipe.execute()
         
-        if not data:
+        if raw is None:
             return None
         
-        return {
-            k.decode() if isinstance(k, bytes) else k: 
-            v.decode() if isinstance(v, bytes) else v 
-            for k, v in data.items()
-        }
+        stats = orjson.loads(raw)
+        stats["events"] = ",".join(events)
+        return stats
 
 
 # =============================================================================
@@ -212,7 +323,15 @@ class IdempotencyTracker:
         self.redis = redis_client
         self.service_name = service_name
         self.prefix = f"idempotency:{service_name}:"
+        # Outside the per-event namespace so it cannot collide with an event
+        # key or show up in a SCAN of idempotency:<service>:*
+        self.duplicate_count_key = f"idempotency-stats:{service_name}:duplicates"
         self.ttl = 86400  # 24 hour TTL for idempotency keys
+        self._duplicates_by_event = _ChildCache(lambda event_type: KAFKA_DUPLICATE_MESSAGES_TOTAL.labels(
+            service=service_name,
+            topic="events",
+            event_type=event_type
+        ))
     
     async def is_duplicate(self, event_id: str, event_type: str) -> bool:
         """
@@ -227,27 +346,54 @@ class IdempotencyTracker:
         
         if result is None:
             # Key already existed - this is a duplicate
-            KAFKA_DUPLICATE_MESSAGES_TOTAL.labels(
-                service=self.service_name,
-                topic="events",
-                event_type=event_type
-            ).inc()
-            logger.info(f"Duplicate event detected: event_id={event_id}, type={event_type}")
+            self._record_duplicate(event_id, event_type)
+            await self.redis.incr(self.duplicate_count_key)
             return True
         
         return False
     
+    async def are_duplicates(self, event_ids: List[str], event_type: str) -> List[bool]:
+        """
+        Batched is_duplicate for a consumer poll.
+        
+        All SET NX commands go out in one pipeline, so a batch of N events
+        costs one round trip instead of N.
+        """
+        async with self.redis.pipeline(transaction=False) as pipe:
+            for event_id in event_ids:
+                pipe.set(f"{self.prefix}{event_id}", "1", nx=True, ex=self.ttl)
+            results = await pipe.execute()
+        
+        duplicates = [result is None for result in results]
+        for event_id, duplicate in zip(event_ids, duplicates):
+            if duplicate:
+                self._record_duplicate(event_id, event_type)
+        
+        duplicate_count = sum(duplicates)
+        if duplicate_count:
+            await self.redis.incrby(self.duplicate_count_key, duplicate_count)
+        return duplicates
+    
+    def _record_duplicate(self, event_id: str, event_type: str) -> None:
+        self._duplicates_by_event[event_type].inc()
+        logger.info(f"Duplicate event detected: event_id={event_id}, type={event_type}")
+    
     async def mark_processed(self, event_id: str) -> None:
         """Explicitly mark an event as processed."""
         key = f"{self.prefix}{event_id}"
         await self.redis.set(key, "1", ex=self.ttl)
     
+    async def unmark_processed(self, event_ids: List[str]) -> None:
+        """Forget events so a redelivery processes them again."""
+        if event_ids:
+            await self.redis.delete(*(f"{self.prefix}{event_id}" for event_id in event_ids))
+    
     async def get_duplicate_count(self) -> int:
         """Get count of duplicate events detected (from metrics)."""
-        # This would typically come from Prometheus, but we can track locally too
-        pattern = f"{self.prefix}*"
-        keys = await self.redis.keys(pattern)
-        return len(keys)
+        # This would typically come from Prometheus, but we can track locally too.
+        # A counter maintained on detection keeps this O(1); KEYS would walk
+        # the whole keyspace and block Redis.
+        return int(await self.redis.get(self.duplicate_count_key) or 0)
 
 
 # =============================================================================
@@ -268,9 +414,12 @@ class OversellDetector:
     3. Periodic reconciliation with physical inventory
     """
     
+    MAX_INCIDENTS = 1000
+    
     def __init__(self, service_name: str = "inventory"):
         self.service_name = service_name
-        self.incidents: list = []
+        # Recent incidents only; the Prometheus counter is the durable record
+        self.incidents: deque = deque(maxlen=self.MAX_INCIDENTS)
     
     def check_and_record(
         self,
@@ -359,10 +508,7 @@ class OversellDetector:
         self.incidents.append(incident)
         
         # Record metric - this is CRITICAL
-        INVENTORY_OVERSELL_INCIDENTS.labels(
-            sku_id=sku_id,
-            warehouse=warehouse
-        ).inc()
+        record_oversell_incident(sku_id, warehouse)
         
         logger.error(
             f"OVERSELL INCIDENT DETECTED: sku={sku_id}, warehouse={warehouse}, "
@@ -371,14 +517,48 @@ class OversellDetector:
     
     def update_stock_metrics(self, sku_id: str, warehouse: str, available: int, reserved: int):
         """Update stock level metrics for monitoring."""
-        INVENTORY_STOCK_LEVEL.labels(sku_id=sku_id, warehouse=warehouse).set(available)
-        INVENTORY_RESERVED_STOCK.labels(sku_id=sku_id, warehouse=warehouse).set(reserved)
+        update_stock_levels(sku_id, warehouse, available, reserved)
 
 
 # =============================================================================
 # KAFKA CONSUMER LAG TRACKER
 # =============================================================================
 
+class LagHistory:
+    """
+    Fixed-size ring buffer of (timestamp, lag) samples for one partition.
+    
+    Samples live in two preallocated typed arrays, so recording one
+    overwrites a slot instead of allocating a dict and re-slicing a list.
+    """
+    
+    __slots__ = ("timestamps", "lags", "capacity", "count", "_next")
+    
+    def __init__(self, capacity: int = 100):
+        self.timestamps = array("d", bytes(8 * capacity))
+        self.lags = array("q", bytes(8 * capacity))
+        self.capacity = capacity
+        self.count = 0
+        self._next = 0
+    
+    def append(self, timestamp: float, lag: int) -> None:
+        self.timestamps[self._next] = timestamp
+        self.lags[self._next] = lag
+        self._next = (self._next + 1) % self.capacity
+        if self.count < self.capacity:
+            self.count += 1
+    
+    def samples(self) -> array:
+        """Recorded lag samples in buffer order (not oldest-first once wrapped)."""
+        return self.lags if self.count == self.capacity else self.lags[:self.count]
+    
+    def latest(self) -> int:
+        return self.lags[self._next - 1]
+    
+    def oldest(self) -> int:
+        return self.lags[self._next if self.count == self.capacity else 0]
+
+
 class ConsumerLagTracker:
     """
     Tracks Kafka consumer lag.
@@ -396,27 +576,41 @@ class ConsumerLagTracker:
     def __init__(self, service_name: str, consumer_group: str):
         self.service_name = service_name
         self.consumer_group = consumer_group
-        self.lag_history: Dict[str, list] = defaultdict(list)
+        self.lag_history: Dict[str, LagHistory] = defaultdict(LagHistory)
+        self._per_topic_lag: Dict[str, Dict[int, int]] = defaultdict(dict)
+        self._lag_by_partition = _ChildCache(self._partition_lag_gauge)
+        self._lag_by_topic = _ChildCache(lambda topic: KAFKA_CONSUMER_TOPIC_LAG.labels(
+            service=service_name,
+            topic=topic,
+            consumer_group=consumer_group
+        ))
+    
+    def _partition_lag_gauge(self, key):
+        # None for partitions past the label guard: a shared "other" gauge
+        # would only hold the last partition's lag
+        partition = PARTITION_LABELS(str(key[1]))
+        if partition == OTHER_LABEL:
+            return None
+        return KAFKA_CONSUMER_LAG.labels(
+            service=self.service_name,
+            topic=key[0],
+            partition=partition,
+            consumer_group=self.consumer_group
+        )
     
     def update_lag(self, topic: str, partition: int, lag: int):
         """Update consumer lag metric."""
-        KAFKA_CONSUMER_LAG.labels(
-            service=self.service_name,
-            topic=topic,
-            partition=str(partition),
-            consumer_group=self.consumer_group
-        ).set(lag)
+        gauge = self._lag_by_partition[(topic, partition)]
+        if gauge is not None:
+            gauge.set(lag)
         
-        # Track history for trend analysis
-        key = f"{topic}:{partition}"
-        self.lag_history[key].append({
-            "timestamp": time.time(),
-            "lag": lag
-        })
+        topic_lag = self._per_topic_lag[topic]
+        topic_lag[partition] = lag
+        self._lag_by_topic[topic].set(sum(topic_lag.values()))
         
-        # Keep only last 100 samples
-        if len(self.lag_history[key]) > 100:
-            self.lag_history[key] = self.lag_history[key][-100:]
+        # Track history for trend analysis (last 100 samples)
+        key = f"{topic}:{partition}"
+        self.lag_history[key].append(time.time(), lag)
         
         # Alert if lag is high
         if lag > 10000:
@@ -428,20 +622,23 @@ class ConsumerLagTracker:
     def get_lag_trend(self, topic: str, partition: int) -> Dict[str, Any]:
         """Get lag trend for a topic/partition."""
         key = f"{topic}:{partition}"
-        history = self.lag_history.get(key, [])
+        history = self.lag_history.get(key)
         
-        if not history:
+        if not history or not history.count:
             return {"trend": "unknown", "samples": 0}
         
-        lags = [h["lag"] for h in history]
+        # min/max/sum reduce over the typed array directly; only the trend
+        # needs sample order, and that is just the oldest and latest slots
+        lags = history.samples()
+        current = history.latest()
         
         return {
-            "current": lags[-1] if lags else 0,
+            "current": current,
             "min": min(lags),
             "max": max(lags),
-            "avg": sum(lags) / len(lags),
-            "trend": "increasing" if len(lags) > 1 and lags[-1] > lags[0] else "stable",
-            "samples": len(lags)
+            "avg": sum(lags) / history.count,
+            "trend": "increasing" if history.count > 1 and current > history.oldest() else "stable",
+            "samples": history.count
         }
     
     async def fetch_lag_from_kafka(self, admin_client) -> Dict[str, int]:
@@ -484,6 +681,10 @@ class DistributedTracker:
         )
         self.service_name = service_name
     
+    async def aclose(self) -> None:
+        """Flush queued workflow events; call at shutdown."""
+        await self.workflow.aclose()
+    
     async def process_event(
         self,
         event_id: str,
@@ -511,3 +712,43 @@ class DistributedTracker:
         except Exception as e:
             logger.error(f"Event processing failed: event_id={event_id}, error={e}")
             raise
+    
+    async def process_events(
+        self,
+        events: List[Dict[str, Any]],
+        event_type: str,
+        handler
+    ) -> List[Dict[str, Any]]:
+        """
+        Batched process_event for one consumer poll of a single event type.
+        
+        Each event must carry an "event_id". Duplicates are checked for the
+        whole batch in one round trip, then handler(event) runs for each new
+        event in order.
+        
+        The check marks the whole batch as seen up front, so if a handler
+        fails, the failing event and every new event after it are unmarked
+        before re-raising; a redelivery then processes them instead of
+        skipping them as duplicates.
+        """
+        duplicates = await self.idempotency.are_duplicates(
+            [event["event_id"] for event in events], event_type
+        )
+        
+        results = []
+        for i, (event, duplicate) in enumerate(zip(events, duplicates)):
+            if duplicate:
+                results.append({"status": "skipped", "reason": "duplicate"})
+                continue
+            try:
+                result = await handler(event)
+                results.append({"status": "processed", "result": result})
+            except Exception as e:
+                logger.error(f"Event processing failed: event_id={event['event_id']}, error={e}")
+                await self.idempotency.unmark_processed([
+                    pending["event_id"]
+                    for pending, pending_duplicate in zip(events[i:], duplicates[i:])
+                    if not pending_duplicate
+                ])
+                raise
+        return results
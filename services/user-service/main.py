@@ -2,16 +2,21 @@
 User Service - Authentication and User Management
 """
 
+import os
+import time
+import asyncio
+import hashlib
 import logging
+from collections import OrderedDict
 from contextlib import asynccontextmanager
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import Any, Dict, Optional
 from uuid import uuid4
 
 from fastapi import FastAPI, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
 from pydantic import BaseModel, EmailStr
-from sqlalchemy import Column, String, DateTime, select
+from sqlalchemy import Column, String, DateTime, select, exists
 from sqlalchemy.ext.asyncio import AsyncSession
 from passlib.context import CryptContext
 from jose import JWTError, jwt
@@ -21,7 +26,7 @@ sys.path.append('..')
 from shared.config import get_settings
 from shared.database import Base, get_db, init_db, engine
 from shared.kafka_client import KafkaProducer, EventTypes, Topics
-from shared.redis_client import RedisClient, CacheKeys
+from shared.redis_client import RedisClient, CacheKeys, close_connection_pool
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -29,9 +34,23 @@ logger = logging.getLogger(__name__)
 settings = get_settings()
 
 # Password hashing
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__rounds=settings.bcrypt_rounds
+)
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/v1/users/login")
 
+# Recent successful logins, as keyed BLAKE2b digests -> expiry (monotonic).
+# Only successes are cached, so a wrong password always pays the full bcrypt cost.
+VERIFY_CACHE_TTL_SECONDS = 60
+VERIFY_CACHE_MAX_SIZE = 10000
+_verify_cache_key = os.urandom(32)
+_verified_logins: "OrderedDict[bytes, float]" = OrderedDict()
+
+# Login credentials (user id + password hash) cached by email
+AUTH_CACHE_TTL_SECONDS = 60
+
 # Kafka and Redis clients
 kafka_producer = KafkaProducer()
 redis_client = RedisClient()
@@ -85,6 +104,37 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
     return pwd_context.verify(plain_password, hashed_password)
 
 
+async def verify_login(email: str, plain_password: str, hashed_password: str) -> bool:
+    """
+    verify_password with a short-lived cache of successful checks.
+    
+    The cache key covers the stored hash, so a password change invalidates it.
+    On a miss bcrypt runs on a worker thread, so failed or uncached logins
+    do not block the event loop.
+    """
+    key = hashlib.blake2b(
+        f"{email}\0{plain_password}\0{hashed_password}".encode(),
+        digest_size=16,
+        key=_verify_cache_key
+    ).digest()
+    now = time.monotonic()
+    expires_at = _verified_logins.get(key)
+    if expires_at is not None and expires_at > now:
+        return True
+    
+    verified = await asyncio.get_running_loop().run_in_executor(
+        None, verify_password, plain_password, hashed_password
+    )
+    if not verified:
+        return False
+    
+    _verified_logins[key] = now + VERIFY_CACHE_TTL_SECONDS
+    _verified_logins.move_to_end(key)
+    if len(_verified_logins) > VERIFY_CACHE_MAX_SIZE:
+        _verified_logins.popitem(last=False)
+    return True
+
+
 def get_password_hash(password: str) -> str:
     return pwd_context.hash(password)
 
@@ -98,7 +148,13 @@ def create_access_token(user_id: str) -> str:
 async def get_current_user(
     token: str = Depends(oauth2_scheme),
     db: AsyncSession = Depends(get_db)
-) -> User:
+) -> Dict[str, Any]:
+    """
+    Resolve the bearer token to the cached user profile.
+    
+    Returns the plain cached dict rather than a User instance; endpoints
+    that modify the user load the ORM row themselves.
+    """
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
@@ -115,22 +171,25 @@ async def get_current_user(
     # Check cache first
     cached_user = await redis_client.get(CacheKeys.user(user_id))
     if cached_user:
-        return User(**cached_user)
+        return cached_user
     
     # Query database
-    result = await db.execute(select(User).where(User.id == user_id))
-    user = result.scalar_one_or_none()
+    result = await db.execute(
+        select(User.id, User.email, User.name, User.created_at).where(User.id == user_id)
+    )
+    row = result.one_or_none()
     
-    if user is None:
+    if row is None:
         raise credentials_exception
     
     # Cache user
-    await redis_client.set(CacheKeys.user(user_id), {
-        "id": user.id,
-        "email": user.email,
-        "name": user.name,
-        "created_at": user.created_at.isoformat()
-    }, ttl=3600)
+    user = {
+        "id": row.id,
+        "email": row.email,
+        "name": row.name,
+        "created_at": row.created_at.isoformat()
+    }
+    await redis_client.set(CacheKeys.user(user_id), user, ttl=3600)
     
     return user
 
@@ -147,6 +206,7 @@ async def lifespan(app: FastAPI):
     # Shutdown
     await kafka_producer.stop()
     await redis_client.disconnect()
+    await close_connection_pool()
     logger.info("User Service stopped")
 
 
@@ -168,9 +228,16 @@ async def health_check():
 @app.post("/api/v1/users/register", response_model=UserResponse, status_code=status.HTTP_201_CREATED)
 async def register_user(user_data: UserCreate, db: AsyncSession = Depends(get_db)):
     """Register a new user."""
-    # Check if email exists
-    result = await db.execute(select(User).where(User.email == user_data.email))
-    if result.scalar_one_or_none():
+    # Hash the password on a worker thread while checking whether the email
+    # exists, so bcrypt neither blocks the event loop nor adds to the latency
+    password_hash = asyncio.get_running_loop().run_in_executor(
+        None, get_password_hash, user_data.password
+    )
+    email_taken, password_hash = await asyncio.gather(
+        db.scalar(select(exists().where(User.email == user_data.email))),
+        password_hash
+    )
+    if email_taken:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Email already registered"
@@ -179,7 +246,7 @@ async def register_user(user_data: UserCreate, db: AsyncSession = Depends(get_db
     # Create user
     user = User(
         email=user_data.email,
-        password_hash=get_password_hash(user_data.password),
+        password_hash=password_hash,
         name=user_data.name
     )
     db.add(user)
@@ -209,24 +276,32 @@ async def login(
     db: AsyncSession = Depends(get_db)
 ):
     """Login and get access token."""
-    result = await db.execute(select(User).where(User.email == form_data.username))
-    user = result.scalar_one_or_none()
+    email = form_data.username
+    auth = await redis_client.get(CacheKeys.auth(email))
+    if auth is None:
+        result = await db.execute(
+            select(User.id, User.password_hash).where(User.email == email)
+        )
+        row = result.one_or_none()
+        if row:
+            auth = {"id": row.id, "password_hash": row.password_hash}
+            await redis_client.set(CacheKeys.auth(email), auth, ttl=AUTH_CACHE_TTL_SECONDS)
     
-    if not user or not verify_password(form_data.password, user.password_hash):
+    if not auth or not await verify_login(email, form_data.password, auth["password_hash"]):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect email or password",
             headers={"WWW-Authenticate": "Bearer"},
         )
     
-    access_token = create_access_token(user.id)
+    access_token = create_access_token(auth["id"])
     
-    logger.info(f"User logged in: {user.email}")
+    logger.info(f"User logged in: {email}")
     return Token(access_token=access_token)
 
 
 @app.get("/api/v1/users/me", response_model=UserResponse)
-async def get_current_user_profile(current_user: User = Depends(get_current_user)):
+async def get_current_user_profile(current_user: Dict[str, Any] = Depends(get_current_user)):
     """Get current user profile."""
     return current_user
 
@@ -234,43 +309,49 @@ async def get_current_user_profile(current_user: User = Depends(get_current_user
 @app.put("/api/v1/users/me", response_model=UserResponse)
 async def update_user_profile(
     user_update: UserUpdate,
-    current_user: User = Depends(get_current_user),
+    current_user: Dict[str, Any] = Depends(get_current_user),
     db: AsyncSession = Depends(get_db)
 ):
     """Update current user profile."""
+    user = await db.get(User, current_user["id"])
+    if user is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
+    previous_email = user.email
     if user_update.name:
-        current_user.name = user_update.name
+        user.name = user_update.name
     if user_update.email:
         # Check if new email is taken
-        result = await db.execute(
-            select(User).where(User.email == user_update.email, User.id != current_user.id)
-        )
-        if result.scalar_one_or_none():
+        email_taken = await db.scalar(select(
+            exists().where(User.email == user_update.email, User.id != user.id)
+        ))
+        if email_taken:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="Email already in use"
             )
-        current_user.email = user_update.email
+        user.email = user_update.email
     
-    db.add(current_user)
+    db.add(user)
     await db.commit()
-    await db.refresh(current_user)
+    await db.refresh(user)
     
     # Invalidate cache
-    await redis_client.delete(CacheKeys.user(current_user.id))
+    await redis_client.delete(CacheKeys.user(user.id))
+    if user.email != previous_email:
+        await redis_client.delete(CacheKeys.auth(previous_email))
     
     # Publish event
     await kafka_producer.publish(
         Topics.USERS,
         {
             "event_type": EventTypes.USER_UPDATED,
-            "user_id": current_user.id,
+            "user_id": user.id,
             "timestamp": datetime.utcnow().isoformat()
         },
-        key=current_user.id
+        key=user.id
     )
     
-    return current_user
+    return user
 
 
 if __name__ == "__main__":